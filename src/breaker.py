@@ -0,0 +1,127 @@
+"""
+Circuit breaker for unreachable players.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import logging
+import time
+from enum import StrEnum
+
+_LOGGER = logging.getLogger(__name__)
+
+# Number of consecutive failed requests before the circuit opens
+FAILURE_THRESHOLD = 3
+# Delay before the first probe once the circuit is open (seconds)
+PROBE_INTERVAL = 5.0
+# Maximum delay between two probes, the delay doubles after each failed probe (seconds)
+MAX_PROBE_INTERVAL = 60.0
+
+
+class BreakerState(StrEnum):
+    """Circuit breaker states."""
+
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+
+class CircuitBreaker:
+    """
+    Per-device circuit breaker.
+
+    The circuit opens after ``failure_threshold`` consecutive failures : requests are then rejected immediately
+    until a probe succeeds. While a probe is in flight the circuit is half-open, a successful probe closes it and a
+    failed one opens it again with a longer probe delay.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        probe_interval: float = PROBE_INTERVAL,
+        max_probe_interval: float = MAX_PROBE_INTERVAL,
+    ):
+        """Create a closed circuit breaker."""
+        self._name = name
+        self._failure_threshold = failure_threshold
+        self._probe_interval = probe_interval
+        self._max_probe_interval = max_probe_interval
+        self._state = BreakerState.CLOSED
+        self._failures = 0
+        self._next_probe_delay = probe_interval
+        self._opened_at: float | None = None
+
+    @property
+    def state(self) -> BreakerState:
+        """Current state of the circuit."""
+        return self._state
+
+    @property
+    def is_closed(self) -> bool:
+        """True if requests are allowed."""
+        return self._state == BreakerState.CLOSED
+
+    @property
+    def failures(self) -> int:
+        """Number of consecutive failures."""
+        return self._failures
+
+    @property
+    def probe_delay(self) -> float:
+        """Delay to wait before the next probe."""
+        return self._next_probe_delay
+
+    @property
+    def open_duration(self) -> float:
+        """Time in seconds since the circuit opened, 0 if closed."""
+        if self._opened_at is None:
+            return 0
+        return time.monotonic() - self._opened_at
+
+    def record_success(self) -> bool:
+        """
+        Record a successful request.
+
+        :return: True if the circuit was closed by this call
+        """
+        self._failures = 0
+        if self._state == BreakerState.CLOSED:
+            return False
+        _LOGGER.debug("[%s] Circuit closed after %.1fs", self._name, self.open_duration)
+        self._state = BreakerState.CLOSED
+        self._next_probe_delay = self._probe_interval
+        self._opened_at = None
+        return True
+
+    def record_failure(self) -> bool:
+        """
+        Record a failed request.
+
+        :return: True if the circuit was opened by this call
+        """
+        self._failures += 1
+        if self._state == BreakerState.HALF_OPEN:
+            # Failed probe : back off before the next one
+            self._state = BreakerState.OPEN
+            self._next_probe_delay = min(self._next_probe_delay * 2, self._max_probe_interval)
+            return False
+        if self._state == BreakerState.CLOSED and self._failures >= self._failure_threshold:
+            _LOGGER.debug("[%s] Circuit opened after %s consecutive failures", self._name, self._failures)
+            self._state = BreakerState.OPEN
+            self._opened_at = time.monotonic()
+            return True
+        return False
+
+    def half_open(self) -> None:
+        """Let a single probe request through."""
+        if self._state == BreakerState.OPEN:
+            self._state = BreakerState.HALF_OPEN
+
+    def reset(self) -> None:
+        """Force the circuit closed, e.g. when the target host changes."""
+        self._state = BreakerState.CLOSED
+        self._failures = 0
+        self._next_probe_delay = self._probe_interval
+        self._opened_at = None
@@ -6,22 +6,65 @@ Client Panasonic Bluray Device
 """
 
 # coding: utf-8
+# pylint: disable=C0302
 import asyncio
 import logging
 from asyncio import CancelledError, Lock
 from datetime import timedelta
 from enum import StrEnum
 from functools import wraps
-from typing import Any, Awaitable, Callable, Concatenate, Coroutine, ParamSpec, TypeVar
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Collection,
+    Concatenate,
+    Coroutine,
+    ParamSpec,
+    TypeVar,
+)
 
 import aiohttp
 import ucapi.media_player
 from aiohttp import ClientError, ClientSession
-from pyee.asyncio import AsyncIOEventEmitter
 from ucapi.media_player import Attributes
 
+from breaker import CircuitBreaker
 from config import DeviceInstance
-from const import KEYS, MEDIA_PLAYER_STATE_MAPPING, USER_AGENT, PlayerVariant, States
+from const import (
+    KEYS,
+    MEDIA_PLAYER_STATE_MAPPING,
+    REPEATABLE_KEYS,
+    USER_AGENT,
+    PlayerVariant,
+    States,
+)
+from eventbus import EventBus
+from keepalive import (
+    KeepAliveDetector,
+    RequestTrace,
+    is_stale_connection_error,
+    trace_config,
+)
+from recording import recorder
+from retry import (
+    KEY_POLICY,
+    PROBE_POLICY,
+    STATUS_POLICY,
+    RetryPolicy,
+    key_policy,
+)
+from rtt import RttEstimator
+from scheduler import (
+    PollCancelled,
+    PollHealth,
+    PollScheduler,
+    RequestPriority,
+    RequestScheduler,
+    watched_poll,
+)
+from snapshot import DeviceSnapshot
+from tracing import tracer
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -34,6 +77,7 @@ class Events(StrEnum):
     UPDATE = "UPDATE"
     IP_ADDRESS_CHANGED = "IP_ADDRESS_CHANGED"
     DISCONNECTED = "DISCONNECTED"
+    CAPABILITIES_CHANGED = "CAPABILITIES_CHANGED"
 
 
 _PanasonicDeviceT = TypeVar("_PanasonicDeviceT", bound="PanasonicBlurayDevice")
@@ -41,8 +85,33 @@ _P = ParamSpec("_P")
 
 CONNECTION_RETRIES = 10
 
+# Polling interval and maximum duration of the power transition mode (seconds)
+POWER_TRANSITION_INTERVAL = 0.5
+POWER_TRANSITION_WINDOW = 20
+
 DEFAULT_MEDIA_DURATION = 18000
 
+# Presence check interval of the devices in warm standby while the remote is in standby (seconds)
+STANDBY_PRESENCE_INTERVAL = 300
+
+# Polling interval while waiting for a device state (seconds)
+WAIT_STATE_INTERVAL = 0.3
+
+# Delay between two presses of a held or repeated key (seconds)
+KEY_REPEAT_INTERVAL = 0.2
+
+# Device states of the play statuses
+_PLAY_STATUS_STATES = {
+    "off": States.OFF,
+    "standby": States.OFF,
+    "paused": States.PAUSED,
+    "stopped": States.STOPPED,
+    "playing": States.PLAYING,
+}
+
+# Number of consecutive rejects of a key before it is considered unsupported by the player
+UNSUPPORTED_KEY_REJECTS = 2
+
 
 def has_error(response: Any) -> bool:
     """Returns true if response has an error."""
@@ -59,6 +128,16 @@ def cmd_wrapper(
     @wraps(func)
     async def wrapper(obj: _PanasonicDeviceT, *args: _P.args, **kwargs: _P.kwargs) -> ucapi.StatusCodes:
         """Wrap all command methods."""
+        with tracer.span(f"command.{func.__name__}", device=obj.id):
+            return await _call(obj, *args, **kwargs)
+
+    async def _call(obj: _PanasonicDeviceT, *args: _P.args, **kwargs: _P.kwargs) -> ucapi.StatusCodes:
+        if not obj.available:
+            # Circuit is open : the device is unreachable, fail fast instead of waiting for a timeout
+            _LOGGER.debug("Device %s is unreachable, %s rejected", obj.id, func.__name__)
+            return ucapi.StatusCodes.SERVICE_UNAVAILABLE
+        # Any new command releases the key being held
+        obj.release_key()
         try:
             res = await func(obj, *args, **kwargs)
             await obj.start_polling()
@@ -71,35 +150,12 @@ def cmd_wrapper(
                 log_function = _LOGGER.debug
             else:
                 log_function = _LOGGER.error
-            log_function(
-                "Error calling %s on entity %s: %r trying to reconnect and send the command next",
-                func.__name__,
-                obj.id,
-                exc,
-            )
-            # Device not connected, launch a connect task but
-            # don't wait more than 5 seconds, then process the command if connected
-            # else returns error
-            # pylint: disable=W0212
-            connect_task = obj._event_loop.create_task(obj.connect())
-            await asyncio.sleep(0)
-            try:
-                async with asyncio.timeout(5):
-                    await connect_task
-            except asyncio.TimeoutError:
-                log_function("Timeout for reconnect, command won't be sent")
-            else:
-                try:
-                    await func(obj, *args, **kwargs)
-                    return ucapi.StatusCodes.OK
-                except ClientError as exc2:
-                    log_function(
-                        "Error calling %s on entity %s: %r trying to reconnect",
-                        func.__name__,
-                        obj.id,
-                        exc2,
-                    )
-            return ucapi.StatusCodes.BAD_REQUEST
+            log_function("Error calling %s on entity %s: %r", func.__name__, obj.id, exc)
+            # The retry policy of the request already applied : a command is never replayed here, it may have
+            # reached the player if the response timed out
+            if isinstance(exc, asyncio.TimeoutError):
+                return ucapi.StatusCodes.TIMEOUT
+            return ucapi.StatusCodes.SERVICE_UNAVAILABLE
         except Exception as ex:  # pylint: disable=W0718
             _LOGGER.error("Unknown error %s : %s", func.__name__, ex)
             return ucapi.StatusCodes.BAD_REQUEST
@@ -110,7 +166,14 @@ def cmd_wrapper(
 class PanasonicBlurayDevice:
     """Panasonic Client"""
 
-    def __init__(self, device_config: DeviceInstance, timeout=3, refresh_frequency=60):
+    def __init__(
+        self,
+        device_config: DeviceInstance,
+        timeout=3,
+        refresh_frequency=60,
+        poll_scheduler: PollScheduler | None = None,
+        session_factory: Callable[[], ClientSession] | None = None,
+    ):
 
         self._id = device_config.id
         self._name = device_config.name
@@ -120,45 +183,210 @@ class PanasonicBlurayDevice:
         self.refresh_frequency = timedelta(seconds=refresh_frequency)
         self._state = States.UNKNOWN
         self._event_loop = asyncio.get_event_loop() or asyncio.get_running_loop()
-        self.events = AsyncIOEventEmitter(self._event_loop)
+        self.events: EventBus[Events] = EventBus(self._event_loop, self._id, coalesce=[Events.UPDATE])
         self._session: ClientSession | None = None
         self._variant = PlayerVariant.AUTO
         self._media_position = 0
         self._media_duration = 0
+        # True while the state is restored from a snapshot and not yet confirmed by the device
+        self._stale = False
         self._update_task = None
+        # Watchdog metrics of the polling task, when not polled by the poll scheduler
+        self._poll_health = PollHealth()
         self._update_lock = Lock()
         self._reconnect_retry = 0
         self._media_position_reset = True
+        self._breaker = CircuitBreaker(self._id)
+        self._probe_task = None
+        self._power_task = None
+        self._scheduler = RequestScheduler(self._id)
+        self._rtt = RttEstimator(self._id, timeout)
+        self._keep_alive = KeepAliveDetector(self._id)
+        self._unsupported_keys = set(device_config.unsupported_keys)
+        self._key_rejects: dict[str, int] = {}
+        self._hold_task: asyncio.Task | None = None
+        self._presence_task: asyncio.Task | None = None
+        self._standby_since: float | None = None
+        self._standby_requests = 0
+        self._requests = 0
+        # Background tasks owned by the device, cancelled on close
+        self._tasks: set[asyncio.Task] = set()
+        self._poll_scheduler = poll_scheduler
+        # Replaces the HTTP session, e.g. to replay recorded traffic
+        self._session_factory = session_factory
+
+    def restore(self, snapshot: DeviceSnapshot) -> None:
+        """
+        Restore the last known state of the device from a snapshot, until confirmed by the first successful poll.
+
+        :param snapshot: persisted snapshot of the device
+        """
+        if self._state != States.UNKNOWN:
+            return
+        try:
+            self._state = States[snapshot.state]
+            self._variant = PlayerVariant[snapshot.variant]
+        except KeyError:
+            _LOGGER.warning("Invalid state snapshot of device %s ignored: %s", self.id, snapshot)
+            self._state = States.UNKNOWN
+            return
+        self._media_duration = snapshot.media_duration
+        self._stale = True
+        _LOGGER.debug("Device %s restored as %s", self.id, self._state.name)
 
     async def connect(self):
         """Connect."""
+        await self._new_session()
+        self.events.emit(Events.CONNECTED, self.id)
+        await self.start_polling()
+
+    async def _new_session(self):
+        """Replace the HTTP session, with a connector applying the current keep-alive strategy."""
         if self._session:
             await self._session.close()
             self._session = None
+        if self._session_factory is not None:
+            self._session = self._session_factory()
+            return
         session_timeout = aiohttp.ClientTimeout(total=None, sock_connect=self._timeout, sock_read=self._timeout)
         self._session = aiohttp.ClientSession(
             headers={"User-Agent": USER_AGENT},
             timeout=session_timeout,
             raise_for_status=True,
+            connector=self._keep_alive.connector(),
+            trace_configs=[trace_config()],
         )
-        self.events.emit(Events.CONNECTED, self.id)
-        await self.start_polling()
 
     async def disconnect(self):
         """Disconnect."""
+        if self._probe_task:
+            self._probe_task.cancel()
+            self._probe_task = None
+        if self._power_task:
+            self._power_task.cancel()
+            self._power_task = None
         if self._session:
             await self._session.close()
             self._session = None
 
+    async def enter_standby(self):
+        """
+        Remote enters standby.
+
+        In warm standby, the session and the last known state are kept and the device is only checked at a low
+        frequency, otherwise it is disconnected.
+        """
+        self._standby_since = self._event_loop.time()
+        self._standby_requests = self._requests
+        if not self._device_config.warm_standby:
+            await self.disconnect()
+            return
+        _LOGGER.debug("Device %s enters warm standby", self.id)
+        await self.stop_polling()
+        if self._presence_task is None or self._presence_task.done():
+            self._presence_task = self.create_task(self._presence_loop())
+
+    async def exit_standby(self) -> bool:
+        """
+        Remote exits standby.
+
+        :return: True if the device was in warm standby : its last known state can be served at once while it is
+                 refreshed in the background, otherwise it has to be connected again.
+        """
+        if self._standby_since is not None:
+            _LOGGER.debug(
+                "Device %s: %s request(s) during %.0fs of standby",
+                self.id,
+                self._requests - self._standby_requests,
+                self._event_loop.time() - self._standby_since,
+            )
+            self._standby_since = None
+        if self._presence_task is None:
+            return False
+        self._presence_task.cancel()
+        self._presence_task = None
+        self.create_task(self._refresh())
+        return True
+
+    async def _presence_loop(self):
+        while True:
+            await asyncio.sleep(STANDBY_PRESENCE_INTERVAL)
+            await self.update()
+
+    async def _refresh(self):
+        await self.update()
+        await self.start_polling()
+
+    async def close(self):
+        """Stop polling, cancel all the background tasks of the device and close the session."""
+        await self.stop_polling()
+        current = asyncio.current_task()
+        tasks = [task for task in self._tasks if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.disconnect()
+
+    def create_task(self, coro: Coroutine) -> asyncio.Task:
+        """Create a background task owned by the device."""
+        task = self._event_loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def reconfigure(self, device_config: DeviceInstance, changes: set[str]) -> None:
+        """
+        Apply an updated configuration in place, without reconnecting.
+
+        :param device_config: updated device configuration
+        :param changes: names of the configuration fields that changed
+        """
+        _LOGGER.debug("Reconfigure device %s: %s", self.id, changes)
+        self._device_config = device_config
+        self._name = device_config.name
+        if "address" in changes:
+            # Another player may answer on the new address
+            self._hostname = device_config.address
+            self._variant = PlayerVariant.AUTO
+            self._breaker.reset()
+            self._rtt.reset()
+            self._keep_alive.reset()
+            self._key_rejects.clear()
+            if "unsupported_keys" not in changes and self._unsupported_keys:
+                # Keys learned from the previous player, the configuration is updated through the event
+                self._unsupported_keys.clear()
+                self.events.emit(Events.CAPABILITIES_CHANGED, self.id, [])
+            if self._probe_task:
+                self._probe_task.cancel()
+                self._probe_task = None
+            self.create_task(self.update())
+        if "unsupported_keys" in changes:
+            self._unsupported_keys = set(device_config.unsupported_keys)
+            self._key_rejects.clear()
+        if "refresh_interval" in changes and self._poll_scheduler is not None:
+            self._poll_scheduler.retune(self.id)
+        if changes & {"address", "always_on"}:
+            self.create_task(self.start_polling())
+
     async def start_polling(self):
         """Start polling task."""
-        if self._update_task is not None:
+        if not self.available:
+            # The probe task takes over until the device is reachable again
+            self._start_probe()
+            return
+        if self._poll_scheduler is not None:
+            if self._poll_scheduler.add(self):
+                self._reconnect_retry = 0
+            return
+        if self._update_task is not None and not self._update_task.done():
             return
         _LOGGER.debug("Start polling task for device %s", self.id)
-        self._update_task = self._event_loop.create_task(self._background_update_task())
+        self._update_task = self.create_task(self._background_update_task())
 
     async def stop_polling(self):
         """Stop polling task."""
+        if self._poll_scheduler is not None:
+            self._poll_scheduler.remove(self.id)
         if self._update_task:
             try:
                 self._update_task.cancel()
@@ -168,49 +396,115 @@ class PanasonicBlurayDevice:
 
     async def _background_update_task(self):
         self._reconnect_retry = 0
-        while True:
-            if not self._device_config.always_on:
-                if self.state == States.OFF:
-                    self._reconnect_retry += 1
-                    if self._reconnect_retry > CONNECTION_RETRIES:
-                        _LOGGER.debug("Stopping update task as the device %s is off", self.id)
+        try:
+            while (delay := await watched_poll(self, self._poll_health)) is not None:
+                await asyncio.sleep(delay)
+        finally:
+            if self._update_task is asyncio.current_task():
+                self._update_task = None
+
+    async def poll(self) -> bool:
+        """
+        Run one polling cycle.
+
+        :return: False if polling should stop
+        """
+        if not self.available:
+            _LOGGER.debug("Stopping update task as the device %s is unreachable", self.id)
+            self._start_probe()
+            return False
+        if not self._device_config.always_on:
+            if self.state == States.OFF:
+                self._reconnect_retry += 1
+                if self._reconnect_retry > CONNECTION_RETRIES:
+                    _LOGGER.debug("Stopping update task as the device %s is off", self.id)
+                    return False
+                _LOGGER.debug("Device %s is off, retry %s", self.id, self._reconnect_retry)
+            elif self._reconnect_retry > 0:
+                self._reconnect_retry = 0
+                _LOGGER.debug("Device %s is on again", self.id)
+        if self._hold_task is not None and not self._hold_task.done():
+            # A key is held : skip this cycle, the device is updated on release
+            return True
+        await self.update()
+        return True
+
+    def _start_probe(self):
+        """Start the probe task if not already running."""
+        if self._probe_task is not None and not self._probe_task.done():
+            return
+        self._probe_task = self.create_task(self._probe_loop())
+
+    async def _probe_loop(self):
+        """Probe the device until it is reachable again, then resume polling."""
+        url = f"http://{self._hostname}/WAN/dvdr/dvdr_ctrl.cgi"
+        data = b"cCMD_PST.x=100&cCMD_PST.y=100"
+        while not self._breaker.is_closed:
+            await asyncio.sleep(self._breaker.probe_delay)
+            self._breaker.half_open()
+            await self.send_cmd(url, data, RequestPriority.POLL, probe=True)
+        _LOGGER.debug("Device %s is reachable again", self.id)
+        self._probe_task = None
+        await self.update()
+        await self.start_polling()
+
+    def _start_power_transition(self):
+        """Poll the device at a high rate until its power state changes."""
+        if self._power_task is not None and not self._power_task.done():
+            self._power_task.cancel()
+        self._power_task = self.create_task(self._power_transition_task(self.is_on))
+
+    async def _power_transition_task(self, was_on: bool):
+        try:
+            async with asyncio.timeout(POWER_TRANSITION_WINDOW):
+                while True:
+                    await asyncio.sleep(POWER_TRANSITION_INTERVAL)
+                    await self.update()
+                    if self.is_on != was_on:
+                        _LOGGER.debug("Device %s power state changed to %s", self.id, self.state)
                         break
-                    _LOGGER.debug("Device %s is off, retry %s", self.id, self._reconnect_retry)
-                elif self._reconnect_retry > 0:
-                    self._reconnect_retry = 0
-                    _LOGGER.debug("Device %s is on again", self.id)
-            await self.update()
-            await asyncio.sleep(self._device_config.refresh_interval)
+        except asyncio.TimeoutError:
+            _LOGGER.debug("Device %s power state unchanged after %ss", self.id, POWER_TRANSITION_WINDOW)
+        self._power_task = None
+        # Back to the normal schedule, the polling task may have stopped while the device was off
+        await self.start_polling()
 
-        self._update_task = None
+    async def wait_for_state(self, states: Collection[States], timeout: float) -> bool:
+        """
+        Wait until the device reaches one of the given states, polling it at a high rate.
+
+        :param states: expected states
+        :param timeout: maximum waiting time in seconds
+        :return: True if the state was reached within the timeout
+        """
+        try:
+            async with asyncio.timeout(timeout):
+                while True:
+                    await self.update()
+                    if self.state in states:
+                        return True
+                    await asyncio.sleep(WAIT_STATE_INTERVAL)
+        except asyncio.TimeoutError:
+            _LOGGER.debug("Device %s still %s after %ss", self.id, self.state.name, timeout)
+            return False
 
     async def update(self, update_position=False):
         """Update data from device."""
         if self._update_lock.locked():
             return
 
-        async with self._update_lock:
+        async with self._update_lock, tracer.span("update", device=self.id):
             # _LOGGER.debug("Refresh Panasonic data")
             if self._session is None:
                 await self.connect()
             update_data = {}
-            status = await self.get_play_status()
-
-            if status[0] == "error":
-                current_state = States.UNAVAILABLE
-            elif status[0] in ["off", "standby"]:
-                # We map both of these to off. If it's really off we can't
-                # turn it on, but from standby we can go to idle by pressing
-                # POWER.
-                current_state = States.OFF
-            elif status[0] == "paused":
-                current_state = States.PAUSED
-            elif status[0] == "stopped":
-                current_state = States.STOPPED
-            elif status[0] == "playing":
-                current_state = States.PLAYING
-            else:
-                current_state = States.UNKNOWN
+            try:
+                status = await self.get_play_status()
+            except PollCancelled:
+                _LOGGER.debug("Device %s poll cancelled by a command", self.id)
+                return
+
+            current_state = self._state_from_status(status[0])
 
             # Update our current media position + length
             if status[1] >= 0:
@@ -225,7 +519,11 @@ class PanasonicBlurayDevice:
             if media_duration == 0:
                 media_duration = DEFAULT_MEDIA_DURATION
 
-            if current_state != self.state:
+            # First answer of the device after a restored state : confirm all the attributes
+            confirmed = self._confirm_restored_state()
+            update_position = update_position or confirmed
+
+            if current_state != self.state or confirmed:
                 self._state = current_state
                 update_data[Attributes.STATE] = MEDIA_PLAYER_STATE_MAPPING.get(
                     self.state, ucapi.media_player.States.UNKNOWN
@@ -249,17 +547,60 @@ class PanasonicBlurayDevice:
             if update_data:
                 self.events.emit(Events.UPDATE, self.id, update_data)
 
-    async def send_cmd(self, url, data):
-        """Send command to the device."""
+    def _state_from_status(self, status: str) -> States:
+        """Return the device state matching the play status."""
+        if status == "error":
+            return States.UNAVAILABLE
+        if self._state == States.UNAVAILABLE and not self.reachable:
+            # Marked unavailable and still not answering
+            return States.UNAVAILABLE
+        # Off and standby are both mapped to off. If it's really off we can't
+        # turn it on, but from standby we can go to idle by pressing POWER.
+        return _PLAY_STATUS_STATES.get(status, States.UNKNOWN)
+
+    def _confirm_restored_state(self) -> bool:
+        """Return True if the state was restored from a snapshot and the device just answered."""
+        if not self._stale or self._breaker.failures > 0:
+            return False
+        _LOGGER.debug("Device %s restored state confirmed", self.id)
+        self._stale = False
+        return True
+
+    async def send_cmd(
+        self, url, data, priority=RequestPriority.COMMAND, probe=False, policy: RetryPolicy | None = None
+    ):
+        """
+        Send command to the device.
+
+        Requests are serialized by the device scheduler, commands having priority over polls. Failed requests are
+        retried according to the given policy, by default the key policy for commands and the status policy for polls.
+
+        :return: ["ok", values], ["error", None] if rejected by the player, ["off", None] if unreachable
+        :raises PollCancelled: if a poll request was cancelled by a command while waiting for its turn
+        :raises ClientError: if a command request failed
+        """
+        if policy is None:
+            if probe:
+                policy = PROBE_POLICY
+            else:
+                policy = KEY_POLICY if priority == RequestPriority.COMMAND else STATUS_POLICY
+        if not probe and not self._breaker.is_closed:
+            # Unreachable device, don't open a socket until the probe succeeds
+            return ["off", None]
         try:
-            if self._session is None:
-                await self.connect()
-            response = await self._session.post(url, data=data)
+            async with self._scheduler.request(priority), tracer.span("http", device=self.id, request=data):
+                if self._session is None:
+                    await self.connect()
+                result = await self._post_with_retries(url, data, priority, policy)
         except ClientError:
+            if self._breaker.record_failure():
+                _LOGGER.debug("Device %s unreachable : %s", self.id, self.diagnostics)
+                self._start_probe()
+            if priority == RequestPriority.COMMAND:
+                raise
             # If we can't reach the device, assume it's off
             return ["off", None]
-
-        result = (await response.read()).split(b"\r\n")
+        self._breaker.record_success()
 
         # First line is '00, "", 1' on success.
         # Error response starts with FE, then some binary data
@@ -268,6 +609,64 @@ class PanasonicBlurayDevice:
 
         return ["ok", result[1].decode().split(",")]
 
+    async def _post_with_retries(self, url, data, priority: RequestPriority, policy: RetryPolicy) -> list[bytes]:
+        """Post the request, retrying according to the policy."""
+        deadline = self._event_loop.time() + policy.deadline
+        # A non-idempotent request is not retried after a read timeout : wait at least the configured timeout, as
+        # the player may answer a key press late while it is busy
+        min_read_timeout = 0.0 if policy.idempotent else self._timeout
+        attempt = 0
+        stale_retried = False
+        while True:
+            trace = RequestTrace()
+            try:
+                return await self._post(url, data, trace, min_read_timeout)
+            except ClientError as ex:
+                if isinstance(ex, asyncio.TimeoutError):
+                    self._rtt.record_timeout()
+                if trace.reused and is_stale_connection_error(ex):
+                    if self._keep_alive.record_stale_connection():
+                        await self._new_session()
+                    if trace.unsent_on_reused_connection and not stale_retried:
+                        # Kept-alive connection closed by the player before the request was sent : retry at once on a
+                        # new connection, whatever the policy. Otherwise the player may have processed the request.
+                        _LOGGER.debug("Device %s dropped the connection (%s), retrying", self.id, type(ex).__name__)
+                        stale_retried = True
+                        continue
+                delay = policy.delay(attempt)
+                if (
+                    not policy.should_retry(ex, attempt)
+                    or self._event_loop.time() + delay > deadline
+                    or (priority == RequestPriority.POLL and self._scheduler.pending)
+                ):
+                    raise
+                _LOGGER.debug("Device %s %s request failed (%r), retrying in %.1fs", self.id, policy.name, ex, delay)
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _post(self, url, data, trace: RequestTrace, min_read_timeout: float = 0.0) -> list[bytes]:
+        """Post the request with the timeouts derived from the round-trip time."""
+        timeout = aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=self._rtt.connect_timeout,
+            sock_read=max(self._rtt.read_timeout, min_read_timeout),
+        )
+        start = self._event_loop.time()
+        self._requests += 1
+        try:
+            response = await self._session.post(url, data=data, timeout=timeout, trace_request_ctx=trace)
+            reply = await response.read()
+        except ClientError as ex:
+            recorder.record(self.id, data, None, self._event_loop.time() - start, type(ex).__name__)
+            raise
+        duration = self._event_loop.time() - start
+        recorder.record(self.id, data, reply, duration)
+        result = reply.split(b"\r\n")
+        self._rtt.record(duration)
+        if self._keep_alive.record_response(response):
+            await self._new_session()
+        return result
+
     async def _send_key(self, key):
         """Send the supplied keypress to the device"""
         # Sanity check it's a valid key
@@ -276,13 +675,14 @@ class PanasonicBlurayDevice:
             # return ['error', None]
 
         # Check the player supports it
-        if self._variant == PlayerVariant.UB:
+        if self._variant == PlayerVariant.UB or key in self._unsupported_keys:
+            _LOGGER.debug("Key %s not supported by device %s", key, self.id)
             return ["error", None]
 
         url = f"http://{self._hostname}/WAN/dvdr/dvdr_ctrl.cgi"
         data = f"cCMD_RC_{key}.x=100&cCMD_RC_{key}.y=100".encode()
 
-        resp = await self.send_cmd(url, data)
+        resp = await self.send_cmd(url, data, policy=key_policy(key))
         # If we're auto-detecting player type then assume we're an newer UB
         # variant if we got an error, and an older BD if it worked
         if self._variant == PlayerVariant.AUTO:
@@ -290,8 +690,26 @@ class PanasonicBlurayDevice:
                 self._variant = PlayerVariant.UB
                 return ["error", None]
             self._variant = PlayerVariant.BD
+        else:
+            self._learn_key_support(key, resp[0] != "error")
         return resp
 
+    def _learn_key_support(self, key: str, supported: bool) -> None:
+        """Mark the key unsupported after consecutive rejects by the player, the keys are then rejected locally."""
+        if not self.is_on or self._stale or self._variant != PlayerVariant.BD:
+            # Rejects of a player in standby or not confirmed yet say nothing about the keys it supports
+            return
+        if supported:
+            self._key_rejects.pop(key, None)
+            return
+        self._key_rejects[key] = self._key_rejects.get(key, 0) + 1
+        if self._key_rejects[key] < UNSUPPORTED_KEY_REJECTS:
+            return
+        _LOGGER.info("Key %s rejected by device %s, marked as unsupported", key, self.id)
+        del self._key_rejects[key]
+        self._unsupported_keys.add(key)
+        self.events.emit(Events.CAPABILITIES_CHANGED, self.id, self.unsupported_keys)
+
     async def get_status(self):
         """Retrieve the status of the device."""
         # Check the player supports it, return a dummy response if not
@@ -301,7 +719,7 @@ class PanasonicBlurayDevice:
         url = f"http://{self._hostname}/WAN/dvdr/dvdr_ctrl.cgi"
         data = b"cCMD_GET_STATUS.x=100&cCMD_GET_STATUS.y=100"
 
-        resp = await self.send_cmd(url, data)
+        resp = await self.send_cmd(url, data, RequestPriority.POLL)
         if resp[0] == "error":
             # If we got an error and we're auto-detecting player type assume
             # it's a more modern UB
@@ -332,7 +750,7 @@ class PanasonicBlurayDevice:
         url = f"http://{self._hostname}/WAN/dvdr/dvdr_ctrl.cgi"
         data = b"cCMD_PST.x=100&cCMD_PST.y=100"
 
-        resp = await self.send_cmd(url, data)
+        resp = await self.send_cmd(url, data, RequestPriority.POLL)
         if resp[0] == "off":
             return ["off", 0, 0]
         if resp[0] == "error":
@@ -394,6 +812,70 @@ class PanasonicBlurayDevice:
         """Media position."""
         return self._media_position
 
+    @property
+    def variant(self) -> PlayerVariant:
+        """Player variant, AUTO until detected."""
+        return self._variant
+
+    @property
+    def stale(self) -> bool:
+        """True if the state is restored from a snapshot and not yet confirmed by the device."""
+        return self._stale
+
+    @property
+    def snapshot(self) -> DeviceSnapshot:
+        """Snapshot of the last known state, to be persisted."""
+        return DeviceSnapshot(self._state.name, self._variant.name, self._media_duration)
+
+    @property
+    def unsupported_keys(self) -> list[str]:
+        """Keys not supported by the device."""
+        return sorted(self._unsupported_keys)
+
+    @property
+    def diagnostics(self) -> dict[str, Any]:
+        """Return the connection diagnostics of the device."""
+        return {
+            "breaker": self._breaker.state,
+            "failures": self._breaker.failures,
+            "rtt": self._rtt.diagnostics(),
+            "keep_alive": self._keep_alive.diagnostics(),
+            "requests_in_flight": self._scheduler.in_flight,
+            "requests_pending": self._scheduler.pending,
+            "cancelled_polls": self._scheduler.cancelled_polls,
+            "requests": self._requests,
+            "stale": self._stale,
+            "events": self.events.diagnostics(),
+            "polling": (
+                self._poll_scheduler.health(self.id)
+                if self._poll_scheduler is not None
+                else self._poll_health.diagnostics(self._event_loop.time())
+            ),
+        }
+
+    @property
+    def poll_interval(self) -> float:
+        """Polling interval in seconds."""
+        return self._device_config.refresh_interval
+
+    @property
+    def available(self) -> bool:
+        """True if the device is reachable (circuit closed)."""
+        return self._breaker.is_closed
+
+    @property
+    def reachable(self) -> bool:
+        """True if the last request to the device succeeded, the circuit only opens after several failures."""
+        return self._breaker.is_closed and self._breaker.failures == 0
+
+    def mark_unavailable(self) -> None:
+        """Mark the device unavailable, its state is published again as soon as it answers."""
+        if self._state == States.UNAVAILABLE:
+            return
+        self._state = States.UNAVAILABLE
+        # Queued after the pending updates of the device
+        self.events.emit(Events.UPDATE, self.id, {Attributes.STATE: ucapi.media_player.States.UNAVAILABLE})
+
     @property
     def is_on(self):
         """True if device is on."""
@@ -404,27 +886,95 @@ class PanasonicBlurayDevice:
         """Send a key to the device."""
         return await self._send_key(key)
 
+    @cmd_wrapper
+    async def hold_key(self, key: str, duration: float, interval: float = KEY_REPEAT_INTERVAL):
+        """
+        Hold a key : send it at the given interval for the hold duration.
+
+        Status polls are suspended while the key is held, which stops on the first error or when another command is
+        sent to the device. Keys which are not repeatable, like the toggles, are sent once.
+
+        :param key: key to hold
+        :param duration: hold duration in seconds
+        :param interval: delay between two presses in seconds
+        """
+        if key not in REPEATABLE_KEYS:
+            return await self._send_key(key)
+        return await self._press_key(key, interval, deadline=self._event_loop.time() + duration)
+
+    @cmd_wrapper
+    async def repeat_key(self, key: str, count: int, interval: float = KEY_REPEAT_INTERVAL):
+        """
+        Send a key the given number of times at the given interval, like a held key.
+
+        :param key: key to send
+        :param count: number of presses
+        :param interval: delay between two presses in seconds
+        """
+        return await self._press_key(key, interval, count=count)
+
+    def release_key(self) -> None:
+        """Release the key being held, if any."""
+        if self._hold_task is not None and not self._hold_task.done():
+            _LOGGER.debug("Key released on device %s", self.id)
+            self._hold_task.cancel()
+        self._hold_task = None
+
+    async def _press_key(self, key: str, interval: float, count: int | None = None, deadline: float | None = None):
+        self._hold_task = self.create_task(self._press_key_task(key, interval, count, deadline))
+        task = self._hold_task
+        await asyncio.wait([task])
+        if self._hold_task is task:
+            self._hold_task = None
+        self.create_task(self.update(update_position=True))
+        if task.cancelled():
+            # Released by another command
+            return ["ok", None]
+        return task.result()
+
+    async def _press_key_task(self, key: str, interval: float, count: int | None, deadline: float | None):
+        presses = 0
+        while True:
+            start = self._event_loop.time()
+            res = await self._send_key(key)
+            presses += 1
+            if res[0] != "ok" or (count is not None and presses >= count):
+                return res
+            next_press = start + interval
+            if deadline is not None and next_press >= deadline:
+                return res
+            await asyncio.sleep(next_press - self._event_loop.time())
+
     @cmd_wrapper
     async def toggle(self):
         """Toggle the device."""
-        await self._send_key("POWER")
+        res = await self._send_key("POWER")
+        if not has_error(res):
+            self._start_power_transition()
+        return res
 
     @cmd_wrapper
     async def turn_on(self):
         """Turn on the device."""
-        await self._send_key("POWERON")
+        res = await self._send_key("POWERON")
+        if not has_error(res):
+            self._start_power_transition()
+        return res
 
     @cmd_wrapper
     async def turn_off(self):
         """Turn off the device."""
-        await self._send_key("POWEROFF")
+        res = await self._send_key("POWEROFF")
+        if not has_error(res):
+            self._start_power_transition()
+        return res
 
     @cmd_wrapper
     async def channel_up(self):
         """Jump to next chapter."""
         res = await self._send_key("SKIPFWD")
         if not has_error(res):
-            asyncio.create_task(self.update())
+            self.create_task(self.update())
         return res
 
     @cmd_wrapper
@@ -432,7 +982,7 @@ class PanasonicBlurayDevice:
         """Jump to previous chapter."""
         res = await self._send_key("SKIPREV")
         if not has_error(res):
-            asyncio.create_task(self.update())
+            self.create_task(self.update())
         return res
 
     @cmd_wrapper
@@ -446,7 +996,7 @@ class PanasonicBlurayDevice:
             res = await self._send_key("PLAYBACK")
         if not has_error(res):
             self._state = new_state
-            asyncio.create_task(self.update(update_position=True))
+            self.create_task(self.update(update_position=True))
         return res
 
     @cmd_wrapper
@@ -455,7 +1005,7 @@ class PanasonicBlurayDevice:
         res = await self._send_key("PLAYBACK")
         if not has_error(res):
             self._state = States.PLAYING
-            asyncio.create_task(self.update(update_position=True))
+            self.create_task(self.update(update_position=True))
         return res
 
     @cmd_wrapper
@@ -464,7 +1014,7 @@ class PanasonicBlurayDevice:
         res = await self._send_key("PAUSE")
         if not has_error(res):
             self._state = States.PAUSED
-            asyncio.create_task(self.update(update_position=True))
+            self.create_task(self.update(update_position=True))
         return res
 
     @cmd_wrapper
@@ -473,7 +1023,7 @@ class PanasonicBlurayDevice:
         res = await self._send_key("STOP")
         if not has_error(res):
             self._state = States.STOPPED
-            asyncio.create_task(self.update(update_position=True))
+            self.create_task(self.update(update_position=True))
         return res
 
     @cmd_wrapper
@@ -482,7 +1032,7 @@ class PanasonicBlurayDevice:
         res = await self._send_key("OP_CL")
         if not has_error(res):
             self._state = States.STOPPED
-            asyncio.create_task(self.update(update_position=True))
+            self.create_task(self.update(update_position=True))
         return res
 
     @cmd_wrapper
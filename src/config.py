@@ -46,16 +46,29 @@ class DeviceInstance:
     address: str
     always_on: bool | None = field(default=False)
     refresh_interval: int | None = field(default=10)
+    warm_standby: bool | None = field(default=False)
+    # Keys rejected by the player, learned at runtime
+    unsupported_keys: list[str] | None = field(default_factory=list)
 
     def __post_init__(self):
         """Apply default values on missing fields."""
         for attribute in fields(self):
             # If there is a default and the value of the field is none we can assign a value
-            if (
-                not isinstance(attribute.default, dataclasses.MISSING.__class__)
-                and getattr(self, attribute.name) is None
-            ):
+            if getattr(self, attribute.name) is not None:
+                continue
+            if not isinstance(attribute.default, dataclasses.MISSING.__class__):
                 setattr(self, attribute.name, attribute.default)
+            elif not isinstance(attribute.default_factory, dataclasses.MISSING.__class__):
+                setattr(self, attribute.name, attribute.default_factory())
+
+
+def config_changes(old: DeviceInstance, new: DeviceInstance) -> set[str]:
+    """Return the names of the configuration fields that differ between the two device configurations."""
+    return {
+        attribute.name
+        for attribute in fields(DeviceInstance)
+        if getattr(old, attribute.name) != getattr(new, attribute.name)
+    }
 
 
 class _EnhancedJSONEncoder(json.JSONEncoder):
@@ -75,7 +88,7 @@ class Devices:
         data_path: str,
         add_handler: Callable[[DeviceInstance], None],
         remove_handler: Callable[[DeviceInstance | None], None],
-        update_handler: Callable[[DeviceInstance], None],
+        update_handler: Callable[[DeviceInstance, set[str]], None],
     ):
         """
         Create a configuration instance for the given configuration path.
@@ -108,18 +121,23 @@ class Devices:
         return False
 
     def add_or_update(self, atv: DeviceInstance) -> None:
-        """Add a new configured device."""
-        if self.contains(atv.id):
-            _LOG.debug("Existing config %s, updating it %s", atv.id, atv)
+        """Add a new configured device, or update an existing one with the fields that changed."""
+        existing = self.get(atv.id)
+        if existing:
+            changes = config_changes(existing, atv)
+            if not changes:
+                _LOG.debug("Existing config %s unchanged", atv.id)
+                return
+            _LOG.debug("Existing config %s, updating it %s (changed: %s)", atv.id, atv, changes)
             self.update(atv)
             if self._update_handler is not None:
-                self._update_handler(atv)
+                self._update_handler(atv, changes)
         else:
             _LOG.debug("Adding new config %s", atv)
             self._config.append(atv)
             self.store()
-        if self._add_handler is not None:
-            self._add_handler(atv)
+            if self._add_handler is not None:
+                self._add_handler(atv)
 
     def get(self, avr_id: str) -> DeviceInstance | None:
         """Get device configuration for given identifier."""
@@ -133,9 +151,8 @@ class Devices:
         """Update a configured Sony device and persist configuration."""
         for item in self._config:
             if item.id == device_instance.id:
-                item.address = device_instance.address
-                item.name = device_instance.name
-                item.always_on = device_instance.always_on
+                for attribute in fields(DeviceInstance):
+                    setattr(item, attribute.name, getattr(device_instance, attribute.name))
                 return self.store()
         return False
 
@@ -209,8 +226,9 @@ class Devices:
                 found = False
                 for old_device in config_backup:
                     if old_device.id == device.id:
-                        if self._update_handler is not None:
-                            self._update_handler(device)
+                        changes = config_changes(old_device, device)
+                        if changes and self._update_handler is not None:
+                            self._update_handler(device, changes)
                         found = True
                         break
                 if not found and self._add_handler is not None:
@@ -10,6 +10,7 @@ from datetime import timedelta
 __version__ = "1.0.0"
 
 from enum import Enum, IntEnum
+from typing import Collection
 
 import ucapi
 from ucapi.ui import Buttons, DeviceButtonMapping, UiPage
@@ -127,6 +128,34 @@ KEYS = [
     "SETUP",
 ]
 
+# Keys repeated while held : search, skip, slow motion and cursor keys. Other keys, like the toggles, are sent once
+REPEATABLE_KEYS = frozenset(
+    {
+        "CUE",
+        "REV",
+        "SKIPFWD",
+        "SKIPREV",
+        "UP",
+        "DOWN",
+        "LEFT",
+        "RIGHT",
+        "JLEFT",
+        "JRIGHT",
+        "MNBACK",
+        "MNSKIP",
+        "SHFWD1",
+        "SHFWD2",
+        "SHFWD3",
+        "SHFWD4",
+        "SHFWD5",
+        "SHREV1",
+        "SHREV2",
+        "SHREV3",
+        "SHREV4",
+        "SHREV5",
+    }
+)
+
 PANASONIC_SIMPLE_COMMANDS = {
     "MENU_HOME": "MLTNAVI",
     "MODE_STATUS": "DSPSEL",
@@ -385,3 +414,34 @@ PANASONIC_REMOTE_UI_PAGES: [UiPage] = [
         ],
     },
 ]
+
+
+def simple_commands(unsupported_keys: Collection[str] = ()) -> list[str]:
+    """Return the simple commands, without the ones mapped to keys unsupported by the player."""
+    return [name for name, key in PANASONIC_SIMPLE_COMMANDS.items() if key not in unsupported_keys]
+
+
+def remote_buttons_mapping(unsupported_keys: Collection[str] = ()) -> list[DeviceButtonMapping]:
+    """Return the remote buttons mapping, without the keys unsupported by the player."""
+    return [
+        button
+        for button in PANASONIC_REMOTE_BUTTONS_MAPPING
+        if button.get("short_press", {}).get("cmd_id") not in unsupported_keys
+    ]
+
+
+def remote_ui_pages(unsupported_keys: Collection[str] = ()) -> list[UiPage]:
+    """Return the remote UI pages, without the items sending keys unsupported by the player."""
+    if not unsupported_keys:
+        return PANASONIC_REMOTE_UI_PAGES
+    return [
+        {
+            **page,
+            "items": [
+                item
+                for item in page["items"]
+                if item.get("command", {}).get("params", {}).get("command") not in unsupported_keys
+            ],
+        }
+        for page in PANASONIC_REMOTE_UI_PAGES
+    ]
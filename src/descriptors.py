@@ -0,0 +1,104 @@
+"""
+Static descriptors of the entities, shared by all the devices.
+
+Features and options of the entities only depend on the keys supported by the player : they are built once per set
+of unsupported keys and shared read-only by the entities, only the attributes are allocated per entity.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Collection
+
+from ucapi import media_player, remote
+
+from const import remote_buttons_mapping, remote_ui_pages, simple_commands
+
+
+class FrozenDict(dict):
+    """Read-only dictionary, serialized as a plain dictionary."""
+
+    def _readonly(self, *_args, **_kwargs):
+        raise TypeError("Shared entity descriptors are read-only")
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+    __ior__ = _readonly
+
+
+def freeze(value: Any) -> Any:
+    """Return a read-only copy of the given JSON-like value : dictionaries are frozen and lists become tuples."""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+MEDIA_PLAYER_FEATURES = (
+    media_player.Features.ON_OFF,
+    media_player.Features.TOGGLE,
+    media_player.Features.MEDIA_TYPE,
+    media_player.Features.PLAY_PAUSE,
+    media_player.Features.DPAD,
+    media_player.Features.SETTINGS,
+    media_player.Features.STOP,
+    media_player.Features.EJECT,
+    media_player.Features.FAST_FORWARD,
+    media_player.Features.REWIND,
+    media_player.Features.MENU,
+    media_player.Features.CONTEXT_MENU,
+    media_player.Features.NUMPAD,
+    media_player.Features.CHANNEL_SWITCHER,
+    media_player.Features.MEDIA_POSITION,
+    media_player.Features.MEDIA_DURATION,
+    media_player.Features.INFO,
+    media_player.Features.AUDIO_TRACK,
+    media_player.Features.SUBTITLE,
+    media_player.Features.COLOR_BUTTONS,
+    media_player.Features.HOME,
+    media_player.Features.PREVIOUS,
+    media_player.Features.NEXT,
+)
+
+REMOTE_FEATURES = (remote.Features.SEND_CMD, remote.Features.ON_OFF, remote.Features.TOGGLE)
+
+
+@dataclass(frozen=True)
+class EntityDescriptors:
+    """Features and options of the entities of a device."""
+
+    media_player_features: tuple[media_player.Features, ...]
+    media_player_options: FrozenDict
+    remote_features: tuple[remote.Features, ...]
+    remote_options: FrozenDict
+
+
+@lru_cache(maxsize=None)
+def _entity_descriptors(unsupported_keys: frozenset[str]) -> EntityDescriptors:
+    commands = simple_commands(unsupported_keys)
+    pages = remote_ui_pages(unsupported_keys)
+    # Same options as built by the remote entity, without the empty ones
+    remote_options = {
+        "simple_commands": commands,
+        "button_mapping": remote_buttons_mapping(unsupported_keys),
+        "user_interface": {"pages": pages} if pages else None,
+    }
+    return EntityDescriptors(
+        media_player_features=MEDIA_PLAYER_FEATURES,
+        media_player_options=freeze({media_player.Options.SIMPLE_COMMANDS: commands}),
+        remote_features=REMOTE_FEATURES,
+        remote_options=freeze({key: value for key, value in remote_options.items() if value}),
+    )
+
+
+def entity_descriptors(unsupported_keys: Collection[str] = ()) -> EntityDescriptors:
+    """Return the shared descriptors of the entities of a player, given the keys it does not support."""
+    return _entity_descriptors(frozenset(unsupported_keys))
@@ -8,11 +8,12 @@ Discovery module
 # -*- coding: utf-8 -*-
 
 import asyncio
+import ipaddress
 import logging
 import re
 import socket
 import xml.etree.ElementTree as ET
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
 from urllib.parse import urlparse
 
 import httpx
@@ -21,6 +22,8 @@ import httpx
 from defusedxml import DefusedXmlException
 from defusedxml.ElementTree import ParseError, fromstring
 
+from const import PlayerVariant, States
+
 _LOGGER = logging.getLogger(__name__)
 
 SSDP_ADDR = "239.255.255.250"
@@ -49,6 +52,19 @@ SUPPORTED_DEVICETYPES = ["urn:schemas-upnp-org:device:MediaRenderer:1"]
 
 SUPPORTED_MANUFACTURERS = ["Panasonic"]
 
+# Subnet scan, used when multicast is blocked on the network
+SCAN_CONCURRENCY = 128
+SCAN_TIMEOUT = 1.0
+SCAN_MAX_HOSTS = 1024
+SCAN_PLAYER_PATH = "/WAN/dvdr/dvdr_ctrl.cgi"
+SCAN_PLAYER_REQUEST = b"cCMD_PST.x=100&cCMD_PST.y=100"
+# The player API answers "00, ..." on success and "FE..." on unsupported or rejected commands
+SCAN_PLAYER_RESPONSE = re.compile(rb"^\s*(00|FE)")
+
+# Validation of the candidate players during setup
+VALIDATE_DEADLINE = 5.0
+VALIDATE_STATUS_REQUEST = b"cCMD_GET_STATUS.x=100&cCMD_GET_STATUS.y=100"
+
 
 def ssdp_request(ssdp_st: str, ssdp_mx: float = SSDP_MX) -> bytes:
     """Return request bytes for given st and mx."""
@@ -98,6 +114,175 @@ async def async_identify_panasonic_devices() -> List[Dict]:
     return devices
 
 
+def get_local_network() -> ipaddress.IPv4Network:
+    """Return the /24 network of the default local address."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        # No packet is sent : this only selects the interface of the default route
+        sock.connect((SSDP_ADDR, SSDP_PORT))
+        local_ip = sock.getsockname()[0]
+    return ipaddress.IPv4Network(f"{local_ip}/24", strict=False)
+
+
+async def async_scan_panasonic_devices(  # pylint: disable=R0914
+    network: str | None = None, concurrency: int = SCAN_CONCURRENCY, timeout: float = SCAN_TIMEOUT
+) -> List[Dict]:
+    """
+    Identify Panasonic players by probing every host of a network range.
+
+    Fallback of the SSDP discovery for networks where multicast is blocked. Each host is sent a unicast SSDP
+    search, whose answer gives the UPnP description, and a status request to the player API. Returns the same
+    dictionaries as async_identify_panasonic_devices, with the model information when the UPnP description is
+    available.
+
+    :param network: network range in CIDR notation, defaults to the local /24 network
+    :param concurrency: maximum number of hosts probed at the same time
+    :param timeout: timeout of each probe in seconds
+    :raises ValueError: if the network range is invalid or too large
+    """
+    subnet = ipaddress.IPv4Network(network, strict=False) if network else get_local_network()
+    hosts = [str(host) for host in subnet.hosts()] if subnet.num_addresses > 1 else [str(subnet.network_address)]
+    if len(hosts) > SCAN_MAX_HOSTS:
+        raise ValueError(f"Network range {subnet} is too large ({len(hosts)} hosts, max {SCAN_MAX_HOSTS})")
+    _LOGGER.debug("Scanning %s hosts of network %s", len(hosts), subnet)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=0)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+
+        async def probe_player(host: str) -> str | None:
+            async with semaphore:
+                try:
+                    res = await client.post(f"http://{host}{SCAN_PLAYER_PATH}", content=SCAN_PLAYER_REQUEST)
+                except httpx.HTTPError:
+                    return None
+            if res.status_code == 200 and SCAN_PLAYER_RESPONSE.match(res.content):
+                return host
+            return None
+
+        async def describe(url: str) -> Dict | None:
+            async with semaphore:
+                try:
+                    res = await client.get(url)
+                    res.raise_for_status()
+                except httpx.HTTPError:
+                    return None
+            return evaluate_scpd_xml(url, res.text)
+
+        ssdp_task = asyncio.create_task(async_send_ssdp_unicast(hosts, timeout))
+        players = {host for host in await asyncio.gather(*(probe_player(host) for host in hosts)) if host}
+        upnp_devices = await asyncio.gather(*(describe(url) for url in await ssdp_task))
+
+    devices = {}
+    for device in upnp_devices:
+        if device is not None:
+            devices[device["host"]] = device
+    for host in sorted(players - devices.keys(), key=ipaddress.IPv4Address):
+        devices[host] = {
+            "host": host,
+            "manufacturer": "Panasonic",
+            "friendlyName": "Blu-ray player",
+            "modelName": None,
+            "serialNumber": None,
+        }
+    _LOGGER.debug("Scan of network %s found %s device(s)", subnet, len(devices))
+    return list(devices.values())
+
+
+class PlayerStatus(NamedTuple):
+    """Variant and state of a player, as answered to the validation."""
+
+    host: str
+    variant: PlayerVariant
+    state: States
+
+
+def _reply_values(reply: bytes) -> List[str] | None:
+    """Return the values of a successful reply of the player API, None if the command was rejected."""
+    lines = reply.split(b"\r\n")
+    if not lines[0].strip().startswith(b"00") or len(lines) < 2:
+        return None
+    return lines[1].decode(errors="replace").split(",")
+
+
+async def async_validate_players(hosts: List[str], deadline: float = VALIDATE_DEADLINE) -> Dict[str, PlayerStatus]:
+    """
+    Validate the given player addresses concurrently, within a single deadline.
+
+    Each player is sent the play status and status requests of the player API, the variant is detected as by the
+    client : players rejecting the status request are UB models.
+
+    :param hosts: player addresses, with the port if not 80
+    :param deadline: maximum duration of the validation in seconds
+    :return: status of the players that answered within the deadline, by address
+    """
+    urls = {}
+    for host in dict.fromkeys(hosts):
+        try:
+            urls[host] = httpx.URL(f"http://{host}{SCAN_PLAYER_PATH}")
+        except (httpx.InvalidURL, ValueError) as ex:
+            _LOGGER.warning("Invalid player address %s: %s", host, ex)
+    if not urls:
+        return {}
+    async with httpx.AsyncClient(timeout=deadline) as client:
+
+        async def validate(host: str, url: httpx.URL) -> PlayerStatus | None:
+            # pylint: disable = W0718
+            try:
+                play_status = _reply_values((await client.post(url, content=SCAN_PLAYER_REQUEST)).content)
+                if play_status is None:
+                    return None
+                status = _reply_values((await client.post(url, content=VALIDATE_STATUS_REQUEST)).content)
+            except httpx.HTTPError as ex:
+                _LOGGER.debug("Player %s did not answer: %s", host, ex)
+                return None
+            except Exception as ex:
+                # A single candidate must not abort the validation of the others
+                _LOGGER.warning("Cannot validate player %s: %s", host, ex)
+                return None
+            variant = PlayerVariant.BD if status is not None else PlayerVariant.UB
+            match play_status[0]:
+                case "0":
+                    # Stopped is also reported in standby, only told apart by the status of the BD models
+                    state = States.OFF if status is not None and status[0] == "0" else States.STOPPED
+                case "1":
+                    state = States.PLAYING
+                case "2":
+                    state = States.PAUSED
+                case _:
+                    state = States.UNKNOWN
+            return PlayerStatus(host, variant, state)
+
+        tasks = [asyncio.create_task(validate(host, url)) for host, url in urls.items()]
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        # Let the cancelled requests release their connections before the client is closed
+        await asyncio.gather(*pending, return_exceptions=True)
+    players = {}
+    for task in done:
+        if task.result() is not None:
+            players[task.result().host] = task.result()
+    _LOGGER.debug("%s of %s player(s) validated", len(players), len(tasks))
+    return players
+
+
+async def async_send_ssdp_unicast(hosts: List[str], timeout: float = SCAN_TIMEOUT) -> Set[str]:
+    """Send a SSDP search to each of the given hosts and return the SCPD XML resource urls of the responses."""
+    try:
+        loop = asyncio.get_running_loop()
+        transport, protocol = await loop.create_datagram_endpoint(
+            lambda: PanasonicSSDP(hosts), family=socket.AF_INET, local_addr=("0.0.0.0", 0)
+        )
+    except OSError as ex:
+        _LOGGER.debug("Cannot send unicast SSDP requests : %s", ex)
+        return set()
+    try:
+        await asyncio.sleep(timeout)
+    finally:
+        transport.close()
+    return protocol.urls
+
+
 async def async_send_ssdp_broadcast() -> Set[str]:
     """
     Send SSDP broadcast messages to discover UPnP devices.
@@ -205,12 +390,22 @@ def evaluate_scpd_xml(url: str, body: str) -> Optional[Dict]:
 class PanasonicSSDP(asyncio.DatagramProtocol):
     """Implements datagram protocol for SSDP discovery of Orange TV devices."""
 
-    def __init__(self) -> None:
-        """Create instance."""
+    def __init__(self, hosts: List[str] | None = None) -> None:
+        """Create instance, the requests are sent to the given hosts instead of the multicast group if set."""
         self.urls = set()
+        self._hosts = hosts
 
     def connection_made(self, transport: asyncio.DatagramTransport) -> None:
         """Send SSDP request when connection was made."""
+        if self._hosts is not None:
+            request = ssdp_request(SSDP_ST_2, 1)
+            for host in self._hosts:
+                try:
+                    transport.sendto(request, (host, SSDP_PORT))
+                except OSError:
+                    pass
+            _LOGGER.debug("SSDP request sent to %s hosts", len(self._hosts))
+            return
         # Prepare SSDP and send broadcast message
         for ssdp_st in SSDP_ST_LIST:
             request = ssdp_request(ssdp_st)
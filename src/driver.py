@@ -7,8 +7,10 @@ This module implements a Remote Two integration driver for Panasonic Bluray.
 """
 
 import asyncio
+import contextlib
 import logging
 import os
+import signal
 import sys
 from enum import Enum
 from typing import Any, Type
@@ -22,21 +24,50 @@ import config
 import media_player
 import remote
 import setup_flow
+import snapshot
 from client import PanasonicBlurayDevice
 from config import device_from_entity_id
+from recording import recorder
+from scheduler import PollScheduler
+from sharding import ShardedDevice, ShardPool
+from tracing import tracer
 
 _LOG = logging.getLogger("driver")  # avoid having __main__ in log messages
-if sys.platform == "win32":
-    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-_LOOP = asyncio.new_event_loop()
+
+
+def _new_event_loop() -> asyncio.AbstractEventLoop:
+    """Create the event loop, uvloop if requested with UC_EVENT_LOOP=uvloop and installed."""
+    if os.getenv("UC_EVENT_LOOP", "asyncio").lower() == "uvloop":
+        try:
+            # pylint: disable=C0415
+            import uvloop
+
+            return uvloop.new_event_loop()
+        except ImportError:
+            # Logging is not configured yet, reported in main()
+            pass
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    return asyncio.new_event_loop()
+
+
+_LOOP = _new_event_loop()
 asyncio.set_event_loop(_LOOP)
 
 # pylint: disable=C0103
 # Global variables
 api = ucapi.IntegrationAPI(_LOOP)
 # Map of device_id -> device instance
-_configured_devices: dict[str, PanasonicBlurayDevice] = {}
+_configured_devices: dict[str, PanasonicBlurayDevice | ShardedDevice] = {}
+# Owns the poll timers of all the configured devices
+_poll_scheduler = PollScheduler(_LOOP)
+# Worker processes polling the devices, only when sharded polling is enabled (UC_POLL_WORKERS)
+_shard_pool: ShardPool | None = None
 _REMOTE_IN_STANDBY = False
+# Maximum time to wait for the devices to answer when the remote connects or exits standby (seconds)
+CONNECT_DEADLINE = 10
+# Delay of the first connection of the devices restored as off, to refresh the devices in use first (seconds)
+OFF_DEVICES_CONNECT_DELAY = 2
 
 
 @api.listens_to(ucapi.Events.CONNECT)
@@ -45,10 +76,7 @@ async def on_r2_connect_cmd() -> None:
     # TODO check if we were in standby and ignore the call? We'll also get an EXIT_STANDBY
     _LOG.debug("R2 connect command: connecting device(s)")
     await api.set_device_state(ucapi.DeviceStates.CONNECTED)
-    for device in _configured_devices.values():
-        # start background task
-        await device.connect()
-        await _LOOP.create_task(device.update())
+    await _connect_devices()
 
 
 @api.listens_to(ucapi.Events.DISCONNECT)
@@ -57,20 +85,21 @@ async def on_r2_disconnect_cmd():
     for device in _configured_devices.values():
         # start background task
         await device.disconnect()
+    _flush_snapshots()
 
 
 @api.listens_to(ucapi.Events.ENTER_STANDBY)
 async def on_r2_enter_standby() -> None:
     """
     Enter standby notification from Remote Two.
-    Disconnect every devices instances.
+    Disconnect every devices instances, except the ones in warm standby which are kept connected.
     """
     global _REMOTE_IN_STANDBY
     _REMOTE_IN_STANDBY = True
-    _LOG.debug("Enter standby event: disconnecting device(s)")
+    _LOG.debug("Enter standby event: disconnecting or keeping warm device(s)")
     for device in _configured_devices.values():
-        # start background task
-        await device.disconnect()
+        await device.enter_standby()
+    _flush_snapshots()
 
 
 @api.listens_to(ucapi.Events.EXIT_STANDBY)
@@ -84,11 +113,58 @@ async def on_r2_exit_standby() -> None:
 
     _REMOTE_IN_STANDBY = False
     _LOG.debug("Exit standby event: connecting device(s)")
+    cold_devices = []
+    for device in list(_configured_devices.values()):
+        if await device.exit_standby():
+            # Warm standby : last known state published at once, confirmed by the background refresh
+            await on_avr_update(device.id, None)
+        else:
+            cold_devices.append(device)
+    await _connect_devices(cold_devices)
 
-    for device in _configured_devices.values():
-        # start background task
+
+async def _connect_devices(devices: list[PanasonicBlurayDevice] | None = None) -> None:
+    """
+    Connect and refresh the given devices at once, all the configured devices by default.
+
+    Entity states are published as each device answers, devices that are unreachable or don't answer within
+    CONNECT_DEADLINE are marked unavailable.
+    """
+    if devices is None:
+        devices = list(_configured_devices.values())
+    tasks = {
+        _LOOP.create_task(
+            _connect_device(device, OFF_DEVICES_CONNECT_DELAY if device.stale and not device.is_on else 0)
+        ): device
+        for device in devices
+    }
+    if not tasks:
+        return
+    _, pending = await asyncio.wait(tasks, timeout=CONNECT_DEADLINE)
+    for task in pending:
+        device = tasks[task]
+        _LOG.warning("Device %s did not answer within %ss", device.id, CONNECT_DEADLINE)
+        task.cancel()
+        _set_entities_unavailable(device.id)
+
+
+async def _connect_device(device: PanasonicBlurayDevice, delay: float = 0) -> None:
+    """Connect and refresh the given device after the given delay, then publish its state."""
+    if delay:
+        await asyncio.sleep(delay)
+    try:
         await device.connect()
-        await _LOOP.create_task(device.update())
+        await device.update()
+    except Exception as ex:  # pylint: disable=W0718
+        _LOG.error("Cannot connect to device %s : %s", device.id, ex)
+        _set_entities_unavailable(device.id)
+        return
+    if not device.reachable:
+        # The circuit only opens after several failures : rely on the result of this first update
+        _LOG.debug("Device %s is unreachable", device.id)
+        _set_entities_unavailable(device.id)
+        return
+    await on_avr_update(device.id, None)
 
 
 @api.listens_to(ucapi.Events.SUBSCRIBE_ENTITIES)
@@ -199,21 +275,7 @@ async def on_device_disconnected(avr_id: str):
     """Handle AVR disconnection."""
     _LOG.debug("AVR disconnected: %s", avr_id)
 
-    for entity_id in _entities_from_device(avr_id):
-        configured_entity = api.configured_entities.get(entity_id)
-        if configured_entity is None:
-            continue
-
-        if configured_entity.entity_type == ucapi.EntityTypes.MEDIA_PLAYER:
-            api.configured_entities.update_attributes(
-                entity_id,
-                {ucapi.media_player.Attributes.STATE: ucapi.media_player.States.UNAVAILABLE},
-            )
-        elif configured_entity.entity_type == ucapi.EntityTypes.REMOTE:
-            api.configured_entities.update_attributes(
-                entity_id,
-                {ucapi.remote.Attributes.STATE: ucapi.remote.States.UNAVAILABLE},
-            )
+    _set_entities_unavailable(avr_id)
 
     # TODO #20 when multiple devices are supported, the device state logic isn't that simple anymore!
     await api.set_device_state(ucapi.DeviceStates.DISCONNECTED)
@@ -223,7 +285,18 @@ async def on_avr_connection_error(avr_id: str, message):
     """Set entities of AVR to state UNAVAILABLE if AVR connection error occurred."""
     _LOG.error(message)
 
-    for entity_id in _entities_from_device(avr_id):
+    _set_entities_unavailable(avr_id)
+
+    # TODO #20 when multiple devices are supported, the device state logic isn't that simple anymore!
+    await api.set_device_state(ucapi.DeviceStates.ERROR)
+
+
+def _set_entities_unavailable(device_id: str) -> None:
+    """Set the entities of the given device to state UNAVAILABLE."""
+    if device_id in _configured_devices:
+        # Its state is published again as soon as it answers
+        _configured_devices[device_id].mark_unavailable()
+    for entity_id in _entities_from_device(device_id):
         configured_entity = api.configured_entities.get(entity_id)
         if configured_entity is None:
             continue
@@ -239,9 +312,6 @@ async def on_avr_connection_error(avr_id: str, message):
                 {ucapi.remote.Attributes.STATE: ucapi.remote.States.UNAVAILABLE},
             )
 
-    # TODO #20 when multiple devices are supported, the device state logic isn't that simple anymore!
-    await api.set_device_state(ucapi.DeviceStates.ERROR)
-
 
 async def handle_avr_address_change(avr_id: str, address: str) -> None:
     """Update device configuration with changed IP address."""
@@ -264,34 +334,35 @@ async def on_avr_update(device_id: str, update: dict[str, Any] | None) -> None:
     :param device_id: AVR identifier
     :param update: dictionary containing the updated properties or None if
     """
-    if update is None:
-        if device_id not in _configured_devices:
-            return
-        device = _configured_devices[device_id]
-        update = {
-            MediaAttr.STATE: device.state,
-            MediaAttr.MEDIA_POSITION: device.media_position,
-            MediaAttr.MEDIA_DURATION: device.media_duration,
-            MediaAttr.MEDIA_TYPE: MediaContentType.VIDEO,
-        }
-    else:
-        _LOG.info("[%s] Panasonic update: %s", device_id, update)
+    with tracer.span("on_avr_update", device=device_id):
+        if update is None:
+            if device_id not in _configured_devices:
+                return
+            device = _configured_devices[device_id]
+            update = {
+                MediaAttr.STATE: media_player.state_from_device(device.state),
+                MediaAttr.MEDIA_POSITION: device.media_position,
+                MediaAttr.MEDIA_DURATION: device.media_duration,
+                MediaAttr.MEDIA_TYPE: MediaContentType.VIDEO,
+            }
+        else:
+            _LOG.info("[%s] Panasonic update: %s", device_id, update)
 
-    attributes = None
+        attributes = None
 
-    # TODO awkward logic: this needs better support from the integration library
-    for entity_id in _entities_from_device(device_id):
-        configured_entity = api.configured_entities.get(entity_id)
-        if configured_entity is None:
-            return
+        # TODO awkward logic: this needs better support from the integration library
+        for entity_id in _entities_from_device(device_id):
+            configured_entity = api.configured_entities.get(entity_id)
+            if configured_entity is None:
+                return
 
-        if isinstance(configured_entity, media_player.PanasonicMediaPlayer):
-            attributes = filter_attributes(update, ucapi.media_player.Attributes)
-        elif isinstance(configured_entity, remote.PanasonicRemote):
-            attributes = configured_entity.filter_changed_attributes(update)
+            if isinstance(configured_entity, media_player.PanasonicMediaPlayer):
+                attributes = filter_attributes(update, ucapi.media_player.Attributes)
+            elif isinstance(configured_entity, remote.PanasonicRemote):
+                attributes = configured_entity.filter_changed_attributes(update)
 
-        if attributes:
-            api.configured_entities.update_attributes(entity_id, attributes)
+            if attributes:
+                api.configured_entities.update_attributes(entity_id, attributes)
 
 
 def _entities_from_device(device_id: str) -> list[str]:
@@ -319,17 +390,27 @@ def _configure_new_device(device_config: config.DeviceInstance, connect: bool =
     if device_config.id in _configured_devices:
         device = _configured_devices[device_config.id]
     else:
-        device = PanasonicBlurayDevice(device_config)
+        if _shard_pool is not None:
+            device = _shard_pool.add_device(device_config)
+        else:
+            device = PanasonicBlurayDevice(device_config, poll_scheduler=_poll_scheduler)
 
         device.events.on(client.Events.CONNECTED, on_device_connected)
         device.events.on(client.Events.ERROR, on_avr_connection_error)
         device.events.on(client.Events.UPDATE, on_avr_update)
+        device.events.on(client.Events.UPDATE, on_device_state_update)
+        device.events.on(client.Events.CAPABILITIES_CHANGED, on_device_capabilities_changed)
         # receiver.events.on(avr.Events.IP_ADDRESS_CHANGED, handle_avr_address_change)
         _configured_devices[device_config.id] = device
 
+        # Entities are created with the last known state, until confirmed by the device
+        device_snapshot = snapshot.snapshots.get(device_config.id) if snapshot.snapshots else None
+        if device_snapshot is not None:
+            device.restore(device_snapshot)
+
     if connect:
         # start background connection task
-        _LOOP.create_task(device.update())
+        device.create_task(device.update())
         _LOOP.create_task(on_device_connected(device_config.id))
     _register_available_entities(device_config, device)
 
@@ -358,10 +439,33 @@ def on_device_added(device: config.DeviceInstance) -> None:
     _configure_new_device(device, connect=False)
 
 
-def on_device_updated(device: config.DeviceInstance) -> None:
-    """Handle an updated device in the configuration."""
-    _LOG.debug("Device config updated: %s, reconnect with new configuration", device)
-    _configure_new_device(device, connect=True)
+def on_device_updated(device: config.DeviceInstance, changes: set[str]) -> None:
+    """Handle an updated device in the configuration, only the changed fields are applied."""
+    if device.id not in _configured_devices:
+        _LOG.debug("Device config updated: %s, connect with new configuration", device)
+        _configure_new_device(device, connect=True)
+        return
+    _LOG.debug("Device config updated: %s (changed: %s)", device, changes)
+    configured = _configured_devices[device.id]
+    configured.reconfigure(device, changes)
+    if changes & {"name", "unsupported_keys"}:
+        _register_available_entities(device, configured)
+
+
+def on_device_state_update(device_id: str, _update: dict[str, Any]) -> None:
+    """Save the snapshot of the device state, written to the configuration directory after a short delay."""
+    device = _configured_devices.get(device_id)
+    if device is not None and snapshot.snapshots is not None:
+        snapshot.snapshots.update(device_id, device.snapshot)
+
+
+def on_device_capabilities_changed(device_id: str, unsupported_keys: list[str]) -> None:
+    """Store the keys learned as unsupported by the device, its entities are updated with the configuration."""
+    device_config = config.devices.get(device_id)
+    if device_config is None:
+        return
+    device_config.unsupported_keys = unsupported_keys
+    config.devices.add_or_update(device_config)
 
 
 def on_device_removed(device: config.DeviceInstance | None) -> None:
@@ -373,20 +477,31 @@ def on_device_removed(device: config.DeviceInstance | None) -> None:
         _configured_devices.clear()
         api.configured_entities.clear()
         api.available_entities.clear()
+        if snapshot.snapshots is not None:
+            snapshot.snapshots.clear()
     else:
         if device.id in _configured_devices:
             _LOG.debug("Disconnecting from removed AVR %s", device.id)
             configured = _configured_devices.pop(device.id)
             _LOOP.create_task(_async_remove(configured))
+            if snapshot.snapshots is not None:
+                snapshot.snapshots.remove(device.id)
+                snapshot.snapshots.flush()
             for entity_id in _entities_from_device(configured.id):
                 api.configured_entities.remove(entity_id)
                 api.available_entities.remove(entity_id)
 
 
+def _flush_snapshots() -> None:
+    """Save the pending state snapshots now instead of after the debounce delay."""
+    if snapshot.snapshots is not None:
+        snapshot.snapshots.flush()
+
+
 async def _async_remove(device: PanasonicBlurayDevice) -> None:
-    """Disconnect from receiver and remove all listeners."""
-    # await device.disconnect()
+    """Stop the device tasks, disconnect from receiver and remove all listeners."""
     device.events.remove_all_listeners()
+    await device.close()
 
 
 async def main():
@@ -394,27 +509,63 @@ async def main():
     logging.basicConfig()
 
     level = os.getenv("UC_LOG_LEVEL", "DEBUG").upper()
+    logging.getLogger("breaker").setLevel(level)
     logging.getLogger("client").setLevel(level)
     logging.getLogger("discover").setLevel(level)
     logging.getLogger("driver").setLevel(level)
+    logging.getLogger("keepalive").setLevel(level)
     logging.getLogger("media_player").setLevel(level)
     logging.getLogger("setup_flow").setLevel(level)
+    logging.getLogger("recording").setLevel(level)
     logging.getLogger("remote").setLevel(level)
-
+    logging.getLogger("rtt").setLevel(level)
+    logging.getLogger("scheduler").setLevel(level)
+    logging.getLogger("sharding").setLevel(level)
+    logging.getLogger("snapshot").setLevel(level)
+    logging.getLogger("tracing").setLevel(level)
+
+    tracer.configure(
+        os.getenv("UC_TRACE_FILE"),
+        os.getenv("UC_TRACE_FORMAT", "jsonl"),
+        float(os.getenv("UC_TRACE_SAMPLE_RATE", "1")),
+    )
+    recorder.configure(os.getenv("UC_RECORD_FILE"))
+
+    global _shard_pool
+    _LOG.info("Event loop: %s.%s", type(_LOOP).__module__, type(_LOOP).__name__)
+    if os.getenv("UC_EVENT_LOOP", "asyncio").lower() == "uvloop" and not type(_LOOP).__module__.startswith("uvloop"):
+        _LOG.warning("uvloop is not installed, using the standard event loop")
+
+    workers = int(os.getenv("UC_POLL_WORKERS", "0"))
+    if workers > 0:
+        _shard_pool = ShardPool(_LOOP, workers)
+        if not _shard_pool.start():
+            _shard_pool = None
+
+    snapshot.snapshots = snapshot.SnapshotStore(api.config_dir_path, _LOOP)
     config.devices = config.Devices(api.config_dir_path, on_device_added, on_device_removed, on_device_updated)
     for device in config.devices.all():
         _LOG.debug("Panasonic device %s %s", device.id, device.address)
         _configure_new_device(device, connect=False)
 
     # _LOOP.create_task(receiver_status_poller())
+    # Devices restored as on are refreshed at once, the others when the remote connects
     for device in _configured_devices.values():
         if not device.is_on:
             continue
-        _LOOP.create_task(device.update())
+        device.create_task(device.update())
 
     await api.init("driver.json", setup_flow.driver_setup_handler)
 
 
 if __name__ == "__main__":
-    _LOOP.run_until_complete(main())
-    _LOOP.run_forever()
+    try:
+        _LOOP.run_until_complete(main())
+        # Stop the loop on termination, so that the pending state snapshots are saved
+        with contextlib.suppress(NotImplementedError):
+            _LOOP.add_signal_handler(signal.SIGTERM, _LOOP.stop)
+        _LOOP.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        _flush_snapshots()
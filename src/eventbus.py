@@ -0,0 +1,123 @@
+"""
+In-process event bus of the device state changes.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import asyncio
+import contextvars
+import inspect
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Collection, Generic, Hashable, TypeVar
+
+_LOGGER = logging.getLogger(__name__)
+
+_E = TypeVar("_E", bound=Hashable)
+
+EventHandler = Callable[..., Awaitable[None] | None]
+
+
+class EventBus(Generic[_E]):
+    """
+    Per-device event bus.
+
+    Events are queued and delivered in order by a single consumer task, started when events are pending and running
+    until the queue is drained, instead of a task per event and listener. Handlers are called one after the other,
+    coroutine handlers being awaited. Consecutive events of the coalesced types, whose last argument is a dictionary
+    of changes, are merged into a single event while waiting for delivery. Handlers see the context variables of the
+    emitter of the event, e.g. its trace identifier, and the context of the first emitter for merged events.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, name: str, coalesce: Collection[_E] = ()):
+        """
+        Create the bus.
+
+        :param loop: event loop running the consumer
+        :param name: name of the bus owner, for logging
+        :param coalesce: event types whose pending changes are merged
+        """
+        self._loop = loop
+        self._name = name
+        self._coalesce = frozenset(coalesce)
+        self._handlers: dict[_E, list[EventHandler]] = {}
+        self._queue: deque[tuple[_E, tuple, contextvars.Context]] = deque()
+        self._consumer: asyncio.Task | None = None
+        self._emitted = 0
+        self._delivered = 0
+        self._coalesced = 0
+        self._max_depth = 0
+        self._errors = 0
+
+    @property
+    def depth(self) -> int:
+        """Number of events waiting for delivery."""
+        return len(self._queue)
+
+    def on(self, event: _E, handler: EventHandler) -> EventHandler:
+        """Register a handler of the given event type."""
+        self._handlers.setdefault(event, []).append(handler)
+        return handler
+
+    def remove_all_listeners(self) -> None:
+        """Remove all the handlers and drop the pending events."""
+        self._handlers.clear()
+        self._queue.clear()
+
+    def emit(self, event: _E, *args: Any) -> None:
+        """Queue an event for delivery to its handlers."""
+        if event not in self._handlers:
+            return
+        self._emitted += 1
+        if event in self._coalesce and self._queue:
+            last_event, last_args, _ = self._queue[-1]
+            # Merge the changes into the last pending event of the same type and subject
+            if last_event == event and last_args[:-1] == args[:-1]:
+                last_args[-1].update(args[-1])
+                self._coalesced += 1
+                return
+        if event in self._coalesce:
+            # Copy of the changes, merged with the next ones
+            args = (*args[:-1], dict(args[-1]))
+        self._queue.append((event, args, contextvars.copy_context()))
+        self._max_depth = max(self._max_depth, len(self._queue))
+        if self._consumer is None:
+            # The consumer outlives the emitter : it must not keep the context of the first one
+            self._consumer = self._loop.create_task(self._consume(), context=contextvars.Context())
+
+    async def _consume(self) -> None:
+        try:
+            while self._queue:
+                event, args, context = self._queue.popleft()
+                # Apply the context of the emitter for the delivery of its event only
+                tokens = [(var, var.set(value)) for var, value in context.items()]
+                try:
+                    await self._deliver(event, args)
+                finally:
+                    for var, token in reversed(tokens):
+                        var.reset(token)
+                self._delivered += 1
+        finally:
+            self._consumer = None
+
+    async def _deliver(self, event: _E, args: tuple) -> None:
+        for handler in tuple(self._handlers.get(event, ())):
+            try:
+                result = handler(*args)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as ex:  # pylint: disable=W0718
+                self._errors += 1
+                _LOGGER.error("[%s] Error in %s handler %s : %s", self._name, event, handler, ex)
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return the queue metrics, for inspection."""
+        return {
+            "depth": len(self._queue),
+            "max_depth": self._max_depth,
+            "emitted": self._emitted,
+            "delivered": self._delivered,
+            "coalesced": self._coalesced,
+            "errors": self._errors,
+        }
@@ -0,0 +1,161 @@
+"""
+HTTP keep-alive detection of the players.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import errno
+import logging
+import time
+from enum import StrEnum
+from typing import Any
+
+import aiohttp
+
+_LOGGER = logging.getLogger(__name__)
+
+# Idle time after which a persistent connection is closed by the client (seconds)
+IDLE_TIMEOUT = 15.0
+# Below this idle time, persistent connections are not worth keeping (seconds)
+MIN_IDLE_TIMEOUT = 1.0
+# Number of stale connections tolerated before falling back to a connection per request
+STALE_CONNECTIONS_LIMIT = 3
+
+_STALE_ERRNOS = {errno.ECONNRESET, errno.EPIPE, errno.ECONNABORTED}
+
+
+class ConnectionStrategy(StrEnum):
+    """Connection reuse strategies."""
+
+    PERSISTENT = "PERSISTENT"
+    PER_REQUEST = "PER_REQUEST"
+
+
+def is_stale_connection_error(ex: BaseException) -> bool:
+    """Return True if the error is a connection closed by the player, to be checked against the request trace."""
+    if isinstance(ex, aiohttp.ServerDisconnectedError):
+        return True
+    if isinstance(ex, aiohttp.ClientConnectorError):
+        return False
+    return isinstance(ex, aiohttp.ClientOSError) and ex.errno in _STALE_ERRNOS
+
+
+class RequestTrace:  # pylint: disable=R0903
+    """Connection events of a request, recorded by the trace configuration of the session."""
+
+    __slots__ = ("reused", "sent")
+
+    def __init__(self):
+        """Create the trace of a request not sent yet."""
+        self.reused = False
+        self.sent = False
+
+    @property
+    def unsent_on_reused_connection(self) -> bool:
+        """True if the request was not sent on a connection reused from the pool : it can be sent again safely."""
+        return self.reused and not self.sent
+
+
+async def _on_connection_reused(_session, context, _params) -> None:
+    if isinstance(context.trace_request_ctx, RequestTrace):
+        context.trace_request_ctx.reused = True
+
+
+async def _on_request_sent(_session, context, _params) -> None:
+    if isinstance(context.trace_request_ctx, RequestTrace):
+        context.trace_request_ctx.sent = True
+
+
+def trace_config() -> aiohttp.TraceConfig:
+    """Return the session trace configuration filling the RequestTrace given as trace context of the requests."""
+    config = aiohttp.TraceConfig()
+    config.on_connection_reuseconn.append(_on_connection_reused)
+    config.on_request_headers_sent.append(_on_request_sent)
+    return config
+
+
+class KeepAliveDetector:
+    """
+    Per-device keep-alive detector.
+
+    Connections are kept open for reuse until the player shows that it does not honour keep-alive : a response with
+    ``Connection: close`` switches to a connection per request, and a connection silently dropped by the player
+    lowers the idle expiry below the observed idle time, until too many stale connections make persistent
+    connections not worth it.
+    """
+
+    def __init__(self, name: str, idle_timeout: float = IDLE_TIMEOUT):
+        """Create a detector, starting with persistent connections."""
+        self._name = name
+        self._initial_idle_timeout = idle_timeout
+        self._idle_timeout = idle_timeout
+        self._strategy = ConnectionStrategy.PERSISTENT
+        self._stale_connections = 0
+        self._last_response: float | None = None
+
+    @property
+    def strategy(self) -> ConnectionStrategy:
+        """Current connection strategy."""
+        return self._strategy
+
+    @property
+    def idle_timeout(self) -> float:
+        """Idle expiry of the persistent connections in seconds."""
+        return self._idle_timeout
+
+    def connector(self) -> aiohttp.TCPConnector:
+        """Return a connector applying the current strategy."""
+        if self._strategy == ConnectionStrategy.PER_REQUEST:
+            return aiohttp.TCPConnector(force_close=True)
+        return aiohttp.TCPConnector(keepalive_timeout=self._idle_timeout)
+
+    def record_response(self, response: aiohttp.ClientResponse) -> bool:
+        """
+        Record a response of the player.
+
+        :return: True if the connection strategy changed and the connector must be replaced
+        """
+        self._last_response = time.monotonic()
+        if self._strategy == ConnectionStrategy.PER_REQUEST:
+            return False
+        if response.headers.get("Connection", "").lower() != "close":
+            return False
+        _LOGGER.debug("[%s] Keep-alive not supported, using a connection per request", self._name)
+        self._strategy = ConnectionStrategy.PER_REQUEST
+        return True
+
+    def record_stale_connection(self) -> bool:
+        """
+        Record a reused connection that was closed by the player.
+
+        :return: True if the connection strategy or idle expiry changed and the connector must be replaced
+        """
+        self._stale_connections += 1
+        if self._strategy == ConnectionStrategy.PER_REQUEST:
+            return False
+        idle = time.monotonic() - self._last_response if self._last_response is not None else 0
+        if self._stale_connections >= STALE_CONNECTIONS_LIMIT or idle / 2 < MIN_IDLE_TIMEOUT:
+            _LOGGER.debug("[%s] Connections dropped by the player, using a connection per request", self._name)
+            self._strategy = ConnectionStrategy.PER_REQUEST
+            return True
+        if idle / 2 < self._idle_timeout:
+            self._idle_timeout = idle / 2
+            _LOGGER.debug("[%s] Connection dropped after %.1fs idle, expiry set to %.1fs", self._name, idle, idle / 2)
+            return True
+        return False
+
+    def reset(self) -> None:
+        """Forget the detected behavior, e.g. when the target host changes."""
+        self._idle_timeout = self._initial_idle_timeout
+        self._strategy = ConnectionStrategy.PERSISTENT
+        self._stale_connections = 0
+        self._last_response = None
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return the detected behavior, for inspection."""
+        return {
+            "strategy": self._strategy,
+            "idle_timeout": round(self._idle_timeout, 1),
+            "stale_connections": self._stale_connections,
+        }
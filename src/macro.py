@@ -0,0 +1,124 @@
+"""
+Command sequences gated by the device state.
+
+A sequence is a list of commands sent in turn, where a ``WAIT:<STATE>[:<timeout>]`` step waits for the device to
+reach the given state (``ON``, ``OFF``, ``PLAYING``, ``PAUSED`` or ``STOPPED``), polled at a high rate, instead of a
+fixed delay. A wait for the power state is inserted after the power keys, unless the next step is a wait.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, NamedTuple, Protocol
+
+from ucapi import StatusCodes
+
+from const import States
+
+_LOG = logging.getLogger(__name__)
+
+WAIT_PREFIX = "WAIT:"
+# Default timeout of a wait step (seconds)
+WAIT_TIMEOUT = 10.0
+# Timeout of the waits inserted after the power keys, the players take a while to boot (seconds)
+POWER_WAIT_TIMEOUT = 30.0
+
+ON_STATES = frozenset({States.ON, States.PLAYING, States.PAUSED, States.STOPPED})
+WAIT_STATES: dict[str, frozenset[States]] = {
+    "ON": ON_STATES,
+    "OFF": frozenset({States.OFF}),
+    "PLAYING": frozenset({States.PLAYING}),
+    "PAUSED": frozenset({States.PAUSED}),
+    "STOPPED": frozenset({States.STOPPED}),
+}
+# Power keys and the state they lead to, None for the toggle
+POWER_KEYS: dict[str, str | None] = {"POWERON": "ON", "POWEROFF": "OFF", "POWER": None}
+
+
+class MacroStep(NamedTuple):
+    """Step of a sequence : a command to send, or a state to wait for."""
+
+    command: str | None
+    wait: str | None = None
+    timeout: float = WAIT_TIMEOUT
+
+
+def parse_step(step: str) -> MacroStep:
+    """
+    Parse a step of a sequence.
+
+    :raises ValueError: if the wait step is invalid
+    """
+    if not step.upper().startswith(WAIT_PREFIX):
+        return MacroStep(step)
+    _, state, *timeout = step.split(":", 2)
+    state = state.strip().upper()
+    if state not in WAIT_STATES:
+        raise ValueError(f"Invalid state {state} in step {step}, expected one of {', '.join(WAIT_STATES)}")
+    return MacroStep(None, state, float(timeout[0]) if timeout and timeout[0] else WAIT_TIMEOUT)
+
+
+class MacroDevice(Protocol):
+    """Device operations used by the sequences."""
+
+    @property
+    def is_on(self) -> bool:
+        """True if device is on."""
+
+    async def wait_for_state(self, states: frozenset[States], timeout: float) -> bool:
+        """Wait until the device reaches one of the given states."""
+
+
+# pylint: disable=R0913,R0917
+async def run_sequence(
+    device: MacroDevice,
+    sequence: list[str],
+    send: Callable[[str], Awaitable[StatusCodes]],
+    key_of: Callable[[str], str | None],
+    delay: float = 0,
+) -> StatusCodes:
+    """
+    Run a sequence of commands.
+
+    :param device: target device
+    :param sequence: commands and wait steps
+    :param send: sends a command and returns its status
+    :param key_of: returns the player key sent by a command, to detect the power keys
+    :param delay: fixed delay after each command, except before a wait
+    :return: status of the last command, BAD_REQUEST if a step is invalid or TIMEOUT if a state was not reached
+    """
+    try:
+        steps = [parse_step(step) for step in sequence]
+    except ValueError as ex:
+        _LOG.error("Invalid sequence %s : %s", sequence, ex)
+        return StatusCodes.BAD_REQUEST
+    res = StatusCodes.OK
+    for index, step in enumerate(steps):
+        if step.wait is not None:
+            if not await _wait(device, step):
+                return StatusCodes.TIMEOUT
+            continue
+        was_on = device.is_on
+        res = await send(step.command)
+        next_step = steps[index + 1] if index + 1 < len(steps) else None
+        if next_step is None or next_step.wait is not None:
+            continue
+        key = key_of(step.command)
+        if key in POWER_KEYS and res == StatusCodes.OK:
+            target = POWER_KEYS[key] or ("OFF" if was_on else "ON")
+            if not await _wait(device, MacroStep(None, target, POWER_WAIT_TIMEOUT)):
+                return StatusCodes.TIMEOUT
+        elif delay > 0:
+            await asyncio.sleep(delay)
+    return res
+
+
+async def _wait(device: MacroDevice, step: MacroStep) -> bool:
+    start = asyncio.get_running_loop().time()
+    if not await device.wait_for_state(WAIT_STATES[step.wait], step.timeout):
+        _LOG.warning("State %s not reached within %ss, sequence aborted", step.wait, step.timeout)
+        return False
+    _LOG.debug("State %s reached in %.1fs", step.wait, asyncio.get_running_loop().time() - start)
+    return True
@@ -13,9 +13,7 @@ from ucapi.media_player import (
     Attributes,
     Commands,
     DeviceClasses,
-    Features,
     MediaContentType,
-    Options,
     States,
 )
 
@@ -23,6 +21,8 @@ import client
 from client import PanasonicBlurayDevice
 from config import DeviceInstance, create_entity_id
 from const import MEDIA_PLAYER_STATE_MAPPING, PANASONIC_SIMPLE_COMMANDS
+from descriptors import entity_descriptors
+from tracing import tracer
 
 _LOG = logging.getLogger(__name__)
 
@@ -35,31 +35,6 @@ class PanasonicMediaPlayer(MediaPlayer):
         self._device = device
 
         entity_id = create_entity_id(config_device.id, EntityTypes.MEDIA_PLAYER)
-        features = [
-            Features.ON_OFF,
-            Features.TOGGLE,
-            Features.MEDIA_TYPE,
-            Features.PLAY_PAUSE,
-            Features.DPAD,
-            Features.SETTINGS,
-            Features.STOP,
-            Features.EJECT,
-            Features.FAST_FORWARD,
-            Features.REWIND,
-            Features.MENU,
-            Features.CONTEXT_MENU,
-            Features.NUMPAD,
-            Features.CHANNEL_SWITCHER,
-            Features.MEDIA_POSITION,
-            Features.MEDIA_DURATION,
-            Features.INFO,
-            Features.AUDIO_TRACK,
-            Features.SUBTITLE,
-            Features.COLOR_BUTTONS,
-            Features.HOME,
-            Features.PREVIOUS,
-            Features.NEXT,
-        ]
         attributes = {
             Attributes.STATE: state_from_device(device.state),
             Attributes.MEDIA_POSITION: device.media_position,
@@ -67,17 +42,17 @@ class PanasonicMediaPlayer(MediaPlayer):
             Attributes.MEDIA_TYPE: MediaContentType.VIDEO,
         }
 
-        options = {Options.SIMPLE_COMMANDS: list(PANASONIC_SIMPLE_COMMANDS.keys())}
+        # Features and options are shared with the entities of the other players, only the attributes are owned
+        descriptors = entity_descriptors(config_device.unsupported_keys)
         super().__init__(
             entity_id,
             config_device.name,
-            features,
+            descriptors.media_player_features,
             attributes,
             device_class=DeviceClasses.STREAMING_BOX,
-            options=options,
+            options=descriptors.media_player_options,
         )
 
-    # pylint: disable=R0911
     async def command(self, cmd_id: str, params: dict[str, Any] | None = None, *, websocket: Any) -> StatusCodes:
         """
         Media-player entity command handler.
@@ -88,6 +63,12 @@ class PanasonicMediaPlayer(MediaPlayer):
         :param params: optional command parameters
         :return: status code of the command request
         """
+        with tracer.start_trace("media_player.command", entity=self.id, cmd=cmd_id):
+            return await self._handle_command(cmd_id, params)
+
+    # pylint: disable=R0911
+    async def _handle_command(self, cmd_id: str, params: dict[str, Any] | None = None) -> StatusCodes:
+        """Handle media-player command."""
         _LOG.info("Got %s command request: %s %s", self.id, cmd_id, params)
         if self._device is None:
             _LOG.warning("No device instance for entity: %s", self.id)
@@ -171,7 +152,7 @@ class PanasonicMediaPlayer(MediaPlayer):
                 return await self._device.send_key("MNSKIP")
             case Commands.PREVIOUS:
                 return await self._device.send_key("MNBACK")
-            case _ if cmd_id in self.options[Options.SIMPLE_COMMANDS]:
+            case _ if cmd_id in PANASONIC_SIMPLE_COMMANDS:
                 if cmd_id == "MODE_ENABLED":
                     await self._device.start_polling()
                     return StatusCodes.OK
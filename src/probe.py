@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Diagnostic probe of a Panasonic player.
+
+Qualifies a player model and firmware patch level without the remote : reports its variant, the latency
+distribution of the status requests and key presses, its keep-alive behavior, the maximum key rate it follows and
+the error rate over the run, as JSON.
+
+Usage:
+    python src/probe.py 192.168.1.20 --duration 30
+    python src/probe.py 192.168.1.20 --skip-keys
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+from typing import Any
+
+from aiohttp import ClientError
+
+from client import PanasonicBlurayDevice
+from config import DeviceInstance
+from discover import SCAN_PLAYER_PATH, async_scan_panasonic_devices
+from retry import key_policy
+from scheduler import RequestPriority
+
+_LOG = logging.getLogger("probe")
+
+STATUS_REQUESTS = {
+    "PST": b"cCMD_PST.x=100&cCMD_PST.y=100",
+    "GET_STATUS": b"cCMD_GET_STATUS.x=100&cCMD_GET_STATUS.y=100",
+}
+# Status display key : cycles the on-screen information without changing the playback
+DEFAULT_KEY = "DSPSEL"
+# Delays between key presses tried to find the maximum key rate (seconds)
+KEY_RATE_INTERVALS = [0.5, 0.3, 0.2, 0.1, 0.05, 0.02]
+KEY_RATE_PRESSES = 10
+
+
+def _distribution(samples: list[float]) -> dict[str, Any]:
+    if not samples:
+        return {"count": 0}
+    samples = sorted(samples)
+    quantiles = statistics.quantiles(samples, n=100, method="inclusive") if len(samples) > 1 else samples * 99
+    return {
+        "count": len(samples),
+        "min_ms": round(samples[0] * 1000, 1),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 1),
+        "p50_ms": round(quantiles[49] * 1000, 1),
+        "p95_ms": round(quantiles[94] * 1000, 1),
+        "p99_ms": round(quantiles[98] * 1000, 1),
+        "max_ms": round(samples[-1] * 1000, 1),
+    }
+
+
+class _Probe:  # pylint: disable=R0903
+    """Probe run against a player."""
+
+    def __init__(self, args: argparse.Namespace):
+        self._args = args
+        self._device = PanasonicBlurayDevice(DeviceInstance(id="probe", name="probe", address=args.address))
+        self._url = f"http://{args.address}{SCAN_PLAYER_PATH}"
+        self._latencies: dict[str, list[float]] = {}
+        self._errors: dict[str, int] = {}
+
+    async def _status_request(self, name: str) -> bool:
+        start = time.monotonic()
+        result = await self._device.send_cmd(self._url, STATUS_REQUESTS[name], RequestPriority.POLL)
+        return self._record(name, start, result[0] == "ok")
+
+    async def _key_press(self, key: str) -> bool:
+        start = time.monotonic()
+        data = f"cCMD_RC_{key}.x=100&cCMD_RC_{key}.y=100".encode()
+        try:
+            # Raw request : unlike the device commands, it neither restarts the polling nor learns the rejected keys
+            result = await self._device.send_cmd(self._url, data, policy=key_policy(key))
+        except ClientError:
+            return self._record(f"KEY_{key}", start, False)
+        return self._record(f"KEY_{key}", start, result[0] == "ok")
+
+    def _record(self, name: str, start: float, success: bool) -> bool:
+        if success:
+            self._latencies.setdefault(name, []).append(time.monotonic() - start)
+        else:
+            self._errors[name] = self._errors.get(name, 0) + 1
+        return success
+
+    async def _identify(self) -> dict[str, Any] | None:
+        """Return the UPnP description of the player, if it answers the discovery."""
+        if ":" in self._args.address:
+            # Discovery only probes the default HTTP port
+            return None
+        try:
+            devices = await async_scan_panasonic_devices(f"{self._args.address}/32", timeout=self._args.timeout)
+        except ValueError as ex:
+            _LOG.warning("Cannot identify %s : %s", self._args.address, ex)
+            return None
+        return devices[0] if devices else None
+
+    async def _measure_latencies(self) -> None:
+        """Send the status requests and key presses in turn for the duration of the run."""
+        names = list(STATUS_REQUESTS) + ([] if self._args.skip_keys else [None])
+        deadline = time.monotonic() + self._args.duration
+        while time.monotonic() < deadline:
+            for name in names:
+                if name is None:
+                    await self._key_press(self._args.key)
+                else:
+                    await self._status_request(name)
+                await asyncio.sleep(self._args.interval)
+
+    async def _measure_keep_alive(self) -> dict[str, Any]:
+        """Send a status request after an idle period, to check whether the player kept the connection."""
+        await asyncio.sleep(self._args.idle)
+        before = self._device.diagnostics["keep_alive"]["stale_connections"]
+        success = await self._status_request("PST")
+        diagnostics = self._device.diagnostics["keep_alive"]
+        return {
+            **diagnostics,
+            "idle_probe_s": self._args.idle,
+            "idle_connection_dropped": diagnostics["stale_connections"] > before,
+            "idle_probe_ok": success,
+        }
+
+    async def _measure_key_rate(self) -> dict[str, Any]:
+        """Press the key at increasing rates, the maximum rate is the last one without errors nor backlog."""
+        steps = []
+        max_rate = None
+        for interval in KEY_RATE_INTERVALS:
+            errors = 0
+            start = time.monotonic()
+            for press in range(KEY_RATE_PRESSES):
+                if not await self._key_press(self._args.key):
+                    errors += 1
+                delay = start + (press + 1) * interval - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            # Presses answered slower than requested pile up : the effective rate is below the requested one
+            rate = KEY_RATE_PRESSES / (time.monotonic() - start)
+            followed = errors == 0 and rate >= 0.9 / interval
+            steps.append({"interval_s": interval, "errors": errors, "keys_per_second": round(rate, 1)})
+            if not followed:
+                break
+            max_rate = round(1 / interval, 1)
+        return {"max_keys_per_second": max_rate, "steps": steps}
+
+    async def run(self) -> dict[str, Any]:
+        """Run the probe and return the report."""
+        report: dict[str, Any] = {"address": self._args.address, "device": await self._identify()}
+        await self._device.connect()
+        await self._device.stop_polling()
+        try:
+            await self._device.update()
+            await self._measure_latencies()
+            report["variant"] = self._device.variant.name
+            report["state"] = self._device.state.name
+            report["keep_alive"] = await self._measure_keep_alive()
+            if not self._args.skip_keys:
+                report["key_rate"] = await self._measure_key_rate()
+        finally:
+            await self._device.close()
+        requests = sum(len(samples) for samples in self._latencies.values()) + sum(self._errors.values())
+        report["latency"] = {
+            name: {**_distribution(self._latencies.get(name, [])), "errors": self._errors.get(name, 0)}
+            for name in sorted(self._latencies.keys() | self._errors.keys())
+        }
+        report["requests"] = requests
+        report["errors"] = dict(self._errors)
+        report["error_rate"] = round(sum(self._errors.values()) / requests, 4) if requests else None
+        report["rtt"] = self._device.diagnostics["rtt"]
+        report["unsupported_keys"] = self._device.unsupported_keys
+        return report
+
+
+async def _run(args: argparse.Namespace) -> dict[str, Any]:
+    # The device is bound to the running event loop
+    return await _Probe(args).run()
+
+
+def main() -> None:
+    """Probe the player and print the report."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0].strip())
+    parser.add_argument("address", help="player address, with the port if not 80")
+    parser.add_argument("--duration", type=float, default=10, help="duration of the latency measures in seconds")
+    parser.add_argument("--interval", type=float, default=0.2, help="delay between two requests in seconds")
+    parser.add_argument("--idle", type=float, default=10, help="idle time before the keep-alive check in seconds")
+    parser.add_argument("--timeout", type=float, default=2, help="timeout of the discovery in seconds")
+    parser.add_argument("--key", default=DEFAULT_KEY, help="key pressed to measure the key latency and rate")
+    parser.add_argument("--skip-keys", action="store_true", help="only send status requests, e.g. during playback")
+    parser.add_argument("--verbose", action="store_true", help="log the requests")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING, stream=sys.stderr)
+
+    report = asyncio.run(_run(args))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Record and replay of the player traffic.
+
+The recorder captures the requests sent to the players with their raw replies and timings. A replay session serves
+the recorded replies back to the client in place of the HTTP session, at the recorded or an accelerated speed, so
+that field issues can be reproduced and optimizations benchmarked without the hardware.
+
+Each line of a trace file is a JSON array : ``[offset, device_id, request, reply, duration, error]`` with the offset
+and duration in seconds, the reply base64 encoded, or null with the error name if the request failed. Files ending
+with ``.gz`` are compressed.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import asyncio
+import base64
+import gzip
+import json
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Any, NamedTuple, TextIO
+
+import aiohttp
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _open(path: str, mode: str) -> TextIO:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    # pylint: disable=R1732
+    return open(path, mode, encoding="utf-8", buffering=1)
+
+
+class Recorder:
+    """Traffic recorder, disabled until configured with a file."""
+
+    def __init__(self):
+        """Create a disabled recorder."""
+        self._file: TextIO | None = None
+        self._start = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        """True if the traffic is recorded."""
+        return self._file is not None
+
+    def configure(self, path: str | None) -> None:
+        """Record the traffic to the given file, or stop recording if no path is given."""
+        self.close()
+        if not path:
+            return
+        try:
+            self._file = _open(path, "a")
+        except OSError as ex:
+            _LOGGER.error("Cannot open record file %s : %s", path, ex)
+            return
+        self._start = time.monotonic()
+        _LOGGER.info("Recording the player traffic to %s", path)
+
+    def close(self) -> None:
+        """Close the record file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def record(
+        self, device_id: str, request: bytes, reply: bytes | None, duration: float, error: str | None = None
+    ) -> None:
+        """Record a request and its reply, or the name of the error if it failed."""
+        if self._file is None:
+            return
+        entry = [
+            round(time.monotonic() - self._start, 4),
+            device_id,
+            request.decode(errors="replace"),
+            base64.b64encode(reply).decode() if reply is not None else None,
+            round(duration, 4),
+            error,
+        ]
+        try:
+            self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        except OSError as ex:
+            _LOGGER.error("Cannot write record, recording disabled : %s", ex)
+            self.close()
+
+
+class _ReplayEntry(NamedTuple):
+    reply: bytes | None
+    duration: float
+    error: str | None
+
+
+def load_trace(path: str) -> dict[str, dict[bytes, list[_ReplayEntry]]]:
+    """Load a trace file, returning the recorded replies by device and request in recorded order."""
+    trace: dict[str, dict[bytes, list[_ReplayEntry]]] = defaultdict(lambda: defaultdict(list))
+    with _open(path, "r") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            _, device_id, request, reply, duration, error = json.loads(line)
+            trace[device_id][request.encode()].append(
+                _ReplayEntry(base64.b64decode(reply) if reply is not None else None, duration, error)
+            )
+    return trace
+
+
+class _ReplayResponse:  # pylint: disable=R0903
+    """Recorded reply, with the subset of the aiohttp response used by the client."""
+
+    def __init__(self, body: bytes):
+        self.headers: dict[str, str] = {}
+        self._body = body
+
+    async def read(self) -> bytes:
+        """Return the recorded reply."""
+        return self._body
+
+
+class ReplaySession:
+    """
+    Replay session, with the subset of the aiohttp client session used by the client.
+
+    The replies recorded for a request are served in the recorded order and then in a loop. Failed requests raise a
+    client error after the recorded duration, timeouts as timeout errors.
+    """
+
+    def __init__(self, replies: dict[bytes, list[_ReplayEntry]], speed: float = 1.0):
+        """
+        Create a replay session from the replies of a device.
+
+        :param replies: recorded replies of the device by request
+        :param speed: replay speed factor, 0 to serve the replies without waiting
+        """
+        self._replies = {request: deque(entries) for request, entries in replies.items()}
+        self._speed = speed
+        self.requests = 0
+
+    async def post(self, _url: str, data: bytes, **_kwargs: Any) -> _ReplayResponse:
+        """Serve the next recorded reply of the request."""
+        self.requests += 1
+        entries = self._replies.get(data)
+        if not entries:
+            raise aiohttp.ClientConnectionError(f"No recorded reply for {data!r}")
+        entry = entries[0]
+        entries.rotate(-1)
+        if self._speed > 0 and entry.duration > 0:
+            await asyncio.sleep(entry.duration / self._speed)
+        if entry.error is not None:
+            if "Timeout" in entry.error:
+                raise aiohttp.ServerTimeoutError(entry.error)
+            raise aiohttp.ClientConnectionError(entry.error)
+        return _ReplayResponse(entry.reply)
+
+    async def close(self) -> None:
+        """Close the session."""
+
+
+# pylint: disable=C0103
+recorder = Recorder()
@@ -10,18 +10,16 @@ import logging
 from typing import Any
 
 from ucapi import EntityTypes, Remote, StatusCodes
-from ucapi.remote import Attributes, Commands, Features, Options
+from ucapi.media_player import States as MediaStates
+from ucapi.remote import Attributes, Commands
 from ucapi.remote import States as RemoteStates
 
 from client import PanasonicBlurayDevice
 from config import DeviceInstance, create_entity_id
-from const import (
-    KEYS,
-    PANASONIC_REMOTE_BUTTONS_MAPPING,
-    PANASONIC_REMOTE_UI_PAGES,
-    PANASONIC_SIMPLE_COMMANDS,
-    States,
-)
+from const import KEYS, PANASONIC_SIMPLE_COMMANDS, States
+from descriptors import entity_descriptors
+from macro import run_sequence
+from tracing import tracer
 
 _LOG = logging.getLogger(__name__)
 
@@ -35,6 +33,17 @@ PANASONIC_REMOTE_STATE_MAPPING = {
     States.STOPPED: RemoteStates.ON,
 }
 
+# Device updates carry media-player states
+MEDIA_PLAYER_REMOTE_STATE_MAPPING = {
+    MediaStates.UNKNOWN: RemoteStates.UNKNOWN,
+    MediaStates.UNAVAILABLE: RemoteStates.UNAVAILABLE,
+    MediaStates.OFF: RemoteStates.OFF,
+    MediaStates.STANDBY: RemoteStates.OFF,
+    MediaStates.ON: RemoteStates.ON,
+    MediaStates.PLAYING: RemoteStates.ON,
+    MediaStates.PAUSED: RemoteStates.ON,
+}
+
 
 class PanasonicRemote(Remote):
     """Representation of a Kodi Media Player entity."""
@@ -44,19 +53,18 @@ class PanasonicRemote(Remote):
         self._device = device
         _LOG.debug("PanasonicRemote init")
         entity_id = create_entity_id(config_device.id, EntityTypes.REMOTE)
-        features = [Features.SEND_CMD, Features.ON_OFF, Features.TOGGLE]
         attributes = {
             Attributes.STATE: PANASONIC_REMOTE_STATE_MAPPING.get(device.state),
         }
+        descriptors = entity_descriptors(config_device.unsupported_keys)
         super().__init__(
             identifier=entity_id,
             name=config_device.name,
-            features=features,
+            features=descriptors.remote_features,
             attributes=attributes,
-            simple_commands=list(PANASONIC_SIMPLE_COMMANDS.keys()),
-            button_mapping=PANASONIC_REMOTE_BUTTONS_MAPPING,
-            ui_pages=PANASONIC_REMOTE_UI_PAGES,
         )
+        # Options are shared with the entities of the other players
+        self.options = descriptors.remote_options
 
     def get_int_param(self, param: str, params: dict[str, Any], default: int):
         """Extract int parameters."""
@@ -83,21 +91,39 @@ class PanasonicRemote(Remote):
             return StatusCodes.SERVICE_UNAVAILABLE
 
         repeat = self.get_int_param("repeat", params, 1)
+        hold = self.get_int_param("hold", params, 0)
+        delay = self.get_int_param("delay", params, 0)
         res = StatusCodes.OK
-        for _ in range(0, repeat):
-            res = await self.handle_command(cmd_id, params)
+        with tracer.start_trace("remote.command", entity=self.id, cmd=cmd_id, command=params.get("command")):
+            key = self._key_from_command(params.get("command", "")) if cmd_id == Commands.SEND_CMD else None
+            if key is not None and hold > 0:
+                # Hold duration in milliseconds
+                return await self._device.hold_key(key, hold / 1000)
+            if key is not None and repeat > 1:
+                # Keep the configured delay between the repeats, else repeat like a held key
+                if delay > 0:
+                    return await self._device.repeat_key(key, repeat, delay)
+                return await self._device.repeat_key(key, repeat)
+            for _ in range(0, repeat):
+                res = await self.handle_command(cmd_id, params)
         return res
 
+    @staticmethod
+    def _key_from_command(command: str) -> str | None:
+        """Return the player key sent by the given command."""
+        if command in PANASONIC_SIMPLE_COMMANDS:
+            return PANASONIC_SIMPLE_COMMANDS[command]
+        return command or None
+
     async def handle_command(self, cmd_id: str, params: dict[str, Any] | None = None) -> StatusCodes:
         """Handle remote command."""
         # pylint: disable=R0911
-        # hold = self.getIntParam("hold", params, 0)
         delay = self.get_int_param("delay", params, 0)
         command = params.get("command", "")
 
         if command in KEYS:
             return await self._device.send_key(command)
-        if command in self.options[Options.SIMPLE_COMMANDS]:
+        if command in PANASONIC_SIMPLE_COMMANDS:
             return await self._device.send_key(PANASONIC_SIMPLE_COMMANDS[command])
         if cmd_id == Commands.ON:
             return await self._device.turn_on()
@@ -109,11 +135,13 @@ class PanasonicRemote(Remote):
             return await self._device.send_key(command)
         if cmd_id == Commands.SEND_CMD_SEQUENCE:
             commands = params.get("sequence", [])  # .split(",")
-            res = StatusCodes.OK
-            for command in commands:
-                res = await self.handle_command(Commands.SEND_CMD, {"command": command, "params": params})
-                if delay > 0:
-                    await asyncio.sleep(delay)
+            res = await run_sequence(
+                self._device,
+                commands,
+                lambda command: self.handle_command(Commands.SEND_CMD, {"command": command, "params": params}),
+                self._key_from_command,
+                delay,
+            )
         else:
             return StatusCodes.NOT_IMPLEMENTED
         if delay > 0 and cmd_id != Commands.SEND_CMD_SEQUENCE:
@@ -144,6 +172,8 @@ class PanasonicRemote(Remote):
 
         if Attributes.STATE in update:
             state = PANASONIC_REMOTE_STATE_MAPPING.get(update[Attributes.STATE])
+            if state is None:
+                state = MEDIA_PLAYER_REMOTE_STATE_MAPPING.get(update[Attributes.STATE])
             attributes = self._key_update_helper(Attributes.STATE, state, attributes)
 
         _LOG.debug("PanasonicRemote update attributes %s -> %s", update, attributes)
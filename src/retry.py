@@ -0,0 +1,63 @@
+"""
+Retry policies of the player requests.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import errno
+from dataclasses import dataclass
+
+import aiohttp
+
+
+def is_unsent_request_error(ex: BaseException) -> bool:
+    """Return True if the request failed before reaching the player, so that it can be sent again safely."""
+    if isinstance(ex, aiohttp.ClientConnectorError):
+        return True
+    # Broken pipe : the connection was closed by the player before the request was written
+    return isinstance(ex, aiohttp.ClientOSError) and ex.errno == errno.EPIPE
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Retry policy of a request.
+
+    Idempotent requests are retried on any client error, the others only if they could not reach the player : a
+    request that timed out while waiting for the response may have been processed and is never replayed.
+    """
+
+    name: str
+    idempotent: bool
+    retries: int
+    deadline: float
+    backoff: float = 0.1
+    max_backoff: float = 1.0
+
+    def should_retry(self, ex: BaseException, attempt: int) -> bool:
+        """Return True if the request can be sent again after the given failed attempt (starting at 0)."""
+        if attempt >= self.retries or not isinstance(ex, aiohttp.ClientError):
+            return False
+        return self.idempotent or is_unsent_request_error(ex)
+
+    def delay(self, attempt: int) -> float:
+        """Return the delay before the retry of the given failed attempt (starting at 0)."""
+        return min(self.backoff * 2**attempt, self.max_backoff)
+
+
+# Status queries : read only, retried within the deadline
+STATUS_POLICY = RetryPolicy("status", idempotent=True, retries=2, deadline=3.0)
+# Reachability probe of an unreachable player : the probe loop takes care of the retries
+PROBE_POLICY = RetryPolicy("probe", idempotent=True, retries=0, deadline=0)
+# Remote keys : a second press has a different effect (toggles, navigation)
+KEY_POLICY = RetryPolicy("key", idempotent=False, retries=1, deadline=2.0)
+# Discrete keys that can be repeated without changing the outcome
+IDEMPOTENT_KEY_POLICY = RetryPolicy("idempotent_key", idempotent=True, retries=2, deadline=5.0)
+
+IDEMPOTENT_KEYS = {"POWERON", "POWEROFF", "STOP"}
+
+
+def key_policy(key: str) -> RetryPolicy:
+    """Return the retry policy of the given remote key."""
+    return IDEMPOTENT_KEY_POLICY if key in IDEMPOTENT_KEYS else KEY_POLICY
@@ -0,0 +1,112 @@
+"""
+Round-trip time estimation of the player requests.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import logging
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+# Smoothing factors of the mean and of the deviation (RFC 6298)
+_ALPHA = 1 / 8
+_BETA = 1 / 4
+# Weight of the deviation in the timeout
+_K = 4
+# Bounds of the derived timeouts in seconds
+MIN_TIMEOUT = 0.5
+MAX_TIMEOUT = 10.0
+# Ratio of the request timeout used for the socket connection, which only takes one round trip
+CONNECT_TIMEOUT_RATIO = 0.5
+# Maximum backoff multiplier applied after consecutive timeouts
+MAX_BACKOFF = 8
+
+
+class RttEstimator:
+    """
+    Per-device round-trip time estimator.
+
+    Keeps a smoothed mean and mean deviation of the request durations, as TCP does for its retransmission timeout,
+    and derives the request timeout from them : ``srtt + 4 * rttvar`` within the configured bounds. The timeout is
+    doubled after each timeout until the next successful request.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_timeout: float,
+        min_timeout: float = MIN_TIMEOUT,
+        max_timeout: float = MAX_TIMEOUT,
+    ):
+        """Create an estimator, the initial timeout is used until the first sample."""
+        self._name = name
+        self._initial_timeout = initial_timeout
+        self._min_timeout = min_timeout
+        self._max_timeout = max(max_timeout, min_timeout)
+        self._srtt: float | None = None
+        self._rttvar = 0.0
+        self._backoff = 1
+        self._samples = 0
+        self._timeouts = 0
+
+    @property
+    def srtt(self) -> float | None:
+        """Smoothed round-trip time in seconds, None before the first sample."""
+        return self._srtt
+
+    @property
+    def rttvar(self) -> float:
+        """Round-trip time mean deviation in seconds."""
+        return self._rttvar
+
+    @property
+    def read_timeout(self) -> float:
+        """Timeout to wait for the response in seconds."""
+        if self._srtt is None:
+            timeout = self._initial_timeout
+        else:
+            timeout = self._srtt + _K * self._rttvar
+        return min(max(timeout * self._backoff, self._min_timeout), self._max_timeout)
+
+    @property
+    def connect_timeout(self) -> float:
+        """Timeout of the socket connection in seconds."""
+        return max(self.read_timeout * CONNECT_TIMEOUT_RATIO, self._min_timeout)
+
+    def record(self, rtt: float) -> None:
+        """Record the duration of a successful request."""
+        self._samples += 1
+        self._backoff = 1
+        if self._srtt is None:
+            self._srtt = rtt
+            self._rttvar = rtt / 2
+            return
+        self._rttvar = (1 - _BETA) * self._rttvar + _BETA * abs(self._srtt - rtt)
+        self._srtt = (1 - _ALPHA) * self._srtt + _ALPHA * rtt
+
+    def record_timeout(self) -> None:
+        """Record a request timeout : back off until the next successful request."""
+        self._timeouts += 1
+        if self._backoff < MAX_BACKOFF:
+            self._backoff *= 2
+            _LOGGER.debug("[%s] Request timeout, timeout raised to %.2fs", self._name, self.read_timeout)
+
+    def reset(self) -> None:
+        """Forget the estimates, e.g. when the target host changes."""
+        self._srtt = None
+        self._rttvar = 0.0
+        self._backoff = 1
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return the current estimates, for inspection."""
+        return {
+            "srtt": round(self._srtt, 4) if self._srtt is not None else None,
+            "rttvar": round(self._rttvar, 4),
+            "connect_timeout": round(self.connect_timeout, 3),
+            "read_timeout": round(self.read_timeout, 3),
+            "backoff": self._backoff,
+            "samples": self._samples,
+            "timeouts": self._timeouts,
+        }
@@ -0,0 +1,433 @@
+"""
+Request scheduling between user commands and background polls.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, AsyncIterator, Protocol
+
+_LOGGER = logging.getLogger(__name__)
+
+# The embedded CGI handler of the players processes one request at a time
+MAX_REQUESTS_IN_FLIGHT = 1
+# Maximum number of polls running at the same time across all devices
+MAX_CONCURRENT_POLLS = 8
+# Golden ratio conjugate : successive phases fill the poll interval evenly whatever the number of devices
+_PHASE_STEP = 0.6180339887498949
+# A poll still running after this many intervals is considered stalled
+STALL_INTERVALS = 3
+# Minimum running time of a stalled poll : a poll may go through several request timeouts (seconds)
+MIN_STALL_TIME = 30.0
+# Delay before restarting the polls of a device after a failed or stalled poll, doubled on each consecutive
+# failure (seconds)
+RESTART_BACKOFF = 1.0
+MAX_RESTART_BACKOFF = 60.0
+
+
+class RequestPriority(IntEnum):
+    """Request priority, lower values are served first."""
+
+    COMMAND = 0
+    POLL = 1
+
+
+class PollCancelled(Exception):
+    """Pending poll request cancelled in favor of a user command."""
+
+
+class RequestScheduler:
+    """
+    Per-device request scheduler.
+
+    Limits the number of requests in flight to the device and serves waiting requests by priority : user commands
+    always go before polls, and polls still waiting for a slot are cancelled when a command arrives.
+    """
+
+    def __init__(self, name: str, max_in_flight: int = MAX_REQUESTS_IN_FLIGHT):
+        """Create a scheduler for the given device."""
+        self._name = name
+        self._max_in_flight = max_in_flight
+        self._in_flight = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._cancelled_polls = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Number of requests in flight."""
+        return self._in_flight
+
+    @property
+    def pending(self) -> int:
+        """Number of requests waiting for a slot."""
+        return len(self._waiters)
+
+    @property
+    def cancelled_polls(self) -> int:
+        """Number of polls cancelled in favor of commands since creation."""
+        return self._cancelled_polls
+
+    @asynccontextmanager
+    async def request(self, priority: RequestPriority) -> AsyncIterator[None]:
+        """
+        Hold a request slot for the duration of the context.
+
+        :raises PollCancelled: if a poll request was cancelled by an incoming command while waiting
+        """
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: RequestPriority) -> None:
+        if priority == RequestPriority.COMMAND:
+            self._cancel_pending_polls()
+        if self._in_flight < self._max_in_flight and not self._waiters:
+            self._in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._counter), future)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted right before the cancellation : hand it over
+                self._release()
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        while self._waiters and self._in_flight < self._max_in_flight:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._in_flight += 1
+            future.set_result(None)
+
+    def _cancel_pending_polls(self) -> None:
+        polls = [entry for entry in self._waiters if entry[0] == RequestPriority.POLL]
+        if not polls:
+            return
+        for entry in polls:
+            self._waiters.remove(entry)
+            if not entry[2].done():
+                entry[2].set_exception(PollCancelled())
+                self._cancelled_polls += 1
+        heapq.heapify(self._waiters)
+        _LOGGER.debug("[%s] %s pending poll(s) cancelled by a command", self._name, len(polls))
+
+
+class Pollable(Protocol):
+    """Device polled by the poll scheduler."""
+
+    @property
+    def id(self) -> str:
+        """Device identifier."""
+
+    @property
+    def poll_interval(self) -> float:
+        """Polling interval in seconds."""
+
+    async def poll(self) -> bool:
+        """Run one polling cycle, return False to stop polling."""
+
+
+def stall_time(interval: float) -> float:
+    """Return the running time after which a poll of the given interval is considered stalled."""
+    return max(STALL_INTERVALS * interval, MIN_STALL_TIME)
+
+
+@dataclass
+class PollHealth:
+    """Watchdog metrics of the polls of a device."""
+
+    polls: int = 0
+    errors: int = 0
+    stalls: int = 0
+    restarts: int = 0
+    failures: int = 0
+    last_completed: float | None = None
+
+    def completed(self, now: float) -> None:
+        """Record a completed poll."""
+        self.polls += 1
+        self.failures = 0
+        self.last_completed = now
+
+    def failed(self, stalled: bool) -> float:
+        """
+        Record a poll which raised an error or stalled.
+
+        :param stalled: True if the poll did not complete in time
+        :return: delay before restarting the polls
+        """
+        if stalled:
+            self.stalls += 1
+        else:
+            self.errors += 1
+        self.restarts += 1
+        self.failures += 1
+        return min(RESTART_BACKOFF * 2 ** (self.failures - 1), MAX_RESTART_BACKOFF)
+
+    def diagnostics(self, now: float) -> dict[str, Any]:
+        """Return the metrics, for inspection."""
+        return {
+            "polls": self.polls,
+            "errors": self.errors,
+            "stalls": self.stalls,
+            "restarts": self.restarts,
+            "consecutive_failures": self.failures,
+            "last_completed_ago": round(now - self.last_completed, 3) if self.last_completed is not None else None,
+        }
+
+
+async def watched_poll(device: Pollable, health: PollHealth) -> float | None:
+    """
+    Run one polling cycle of a device polled by its own task, restarted with a backoff if it fails or stalls.
+
+    :param device: polled device
+    :param health: watchdog metrics of the device
+    :return: delay before the next poll, None if polling should stop
+    """
+    loop = asyncio.get_running_loop()
+    deadline = asyncio.timeout(stall_time(device.poll_interval))
+    try:
+        async with deadline:
+            if not await device.poll():
+                return None
+    except asyncio.TimeoutError:
+        if not deadline.expired():
+            raise
+        _LOGGER.warning("Poll of device %s stalled", device.id)
+        return health.failed(stalled=True)
+    except Exception as ex:  # pylint: disable=W0718
+        _LOGGER.error("Error while polling device %s : %s", device.id, ex)
+        return health.failed(stalled=False)
+    health.completed(loop.time())
+    return device.poll_interval
+
+
+@dataclass
+class _PollEntry:
+    device: Pollable
+    phase: float
+    next_due: float
+    generation: int
+    health: PollHealth = field(default_factory=PollHealth)
+    running_since: float | None = field(default=None)
+    last_duration: float | None = field(default=None)
+
+
+class PollScheduler:
+    """
+    Fleet-wide poll scheduler.
+
+    A single task owns the poll timers of all the devices : each device is given a phase within its interval so that
+    polls are spread evenly instead of firing in sync, and the number of polls running at the same time is capped.
+    It also acts as a watchdog : a poll which raised an error or is still running after a few intervals is restarted
+    with an exponential backoff, so that a single bad reply cannot stop the polls of a device.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_concurrent: int = MAX_CONCURRENT_POLLS):
+        """Create the scheduler, the timer task starts with the first scheduled device."""
+        self._loop = loop
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._entries: dict[str, _PollEntry] = {}
+        self._heap: list[tuple[float, int, str, int]] = []
+        self._counter = itertools.count()
+        self._phase = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._running: dict[str, asyncio.Task] = {}
+
+    def __contains__(self, device_id: str) -> bool:
+        """Return True if the device is scheduled."""
+        return device_id in self._entries
+
+    def add(self, device: Pollable) -> bool:
+        """
+        Schedule polling of the given device.
+
+        :return: True if the device was not already scheduled
+        """
+        if device.id in self._entries:
+            return False
+        self._phase = (self._phase + _PHASE_STEP) % 1
+        entry = _PollEntry(
+            device=device,
+            phase=self._phase,
+            next_due=self._loop.time() + self._phase * device.poll_interval,
+            generation=next(self._counter),
+        )
+        self._entries[device.id] = entry
+        self._push(entry)
+        if self._task is None or self._task.done():
+            self._task = self._loop.create_task(self._run())
+        _LOGGER.debug("Polling scheduled for %s in %.1fs", device.id, entry.next_due - self._loop.time())
+        return True
+
+    def remove(self, device_id: str) -> bool:
+        """
+        Stop polling the given device and cancel its poll in progress.
+
+        :return: True if the device was scheduled
+        """
+        task = self._running.get(device_id)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+        return self._entries.pop(device_id, None) is not None
+
+    def retune(self, device_id: str) -> None:
+        """Apply a new polling interval of the given device, keeping its phase."""
+        entry = self._entries.get(device_id)
+        if entry is None:
+            return
+        entry.generation = next(self._counter)
+        entry.next_due = min(entry.next_due, self._loop.time() + entry.phase * entry.device.poll_interval)
+        self._push(entry)
+
+    async def stop(self) -> None:
+        """Stop all polling."""
+        self._entries.clear()
+        self._heap.clear()
+        tasks = list(self._running.values())
+        if self._task:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def schedule(self) -> list[dict[str, Any]]:
+        """Return the current schedule ordered by next poll time, for inspection."""
+        now = self._loop.time()
+        return [
+            {
+                "device_id": device_id,
+                "interval": entry.device.poll_interval,
+                "phase": round(entry.phase, 3),
+                "next_poll_in": round(max(entry.next_due - now, 0), 3),
+                "running": device_id in self._running,
+                "last_duration": entry.last_duration,
+                **entry.health.diagnostics(now),
+            }
+            for device_id, entry in sorted(self._entries.items(), key=lambda item: item[1].next_due)
+        ]
+
+    def health(self, device_id: str) -> dict[str, Any] | None:
+        """Return the watchdog metrics of the given device, None if it is not scheduled."""
+        entry = self._entries.get(device_id)
+        return entry.health.diagnostics(self._loop.time()) if entry is not None else None
+
+    def _push(self, entry: _PollEntry) -> None:
+        heapq.heappush(self._heap, (entry.next_due, next(self._counter), entry.device.id, entry.generation))
+        self._wakeup.set()
+
+    def _reschedule(self, entry: _PollEntry) -> None:
+        # Keep the phase of the device : skip the missed slots if the poll overran its interval
+        interval = entry.device.poll_interval
+        now = self._loop.time()
+        entry.next_due += interval
+        if entry.next_due <= now:
+            entry.next_due += ((now - entry.next_due) // interval + 1) * interval
+        self._push(entry)
+
+    def _restart(self, entry: _PollEntry, stalled: bool) -> None:
+        delay = entry.health.failed(stalled)
+        _LOGGER.warning(
+            "Polling of device %s restarted in %.0fs after %s consecutive failure(s)",
+            entry.device.id,
+            delay,
+            entry.health.failures,
+        )
+        entry.generation = next(self._counter)
+        entry.next_due = self._loop.time() + delay
+        self._push(entry)
+
+    def _watch(self, now: float) -> float | None:
+        """Restart the stalled polls, return the time of the next check."""
+        next_check = None
+        for device_id in list(self._running):
+            entry = self._entries.get(device_id)
+            if entry is None or entry.running_since is None:
+                # Polls waiting for a slot are not running yet
+                continue
+            stalled_at = entry.running_since + stall_time(entry.device.poll_interval)
+            if stalled_at > now:
+                next_check = stalled_at if next_check is None else min(next_check, stalled_at)
+                continue
+            _LOGGER.warning("Poll of device %s stalled for %.0fs", device_id, now - entry.running_since)
+            self._running.pop(device_id).cancel()
+            self._restart(entry, stalled=True)
+        return next_check
+
+    async def _run(self) -> None:
+        while self._entries:
+            now = self._loop.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, device_id, generation = heapq.heappop(self._heap)
+                entry = self._entries.get(device_id)
+                if entry is None or entry.generation != generation:
+                    continue
+                if device_id in self._running:
+                    # Previous poll still running : skip this slot
+                    self._reschedule(entry)
+                    continue
+                entry.running_since = None
+                self._running[device_id] = self._loop.create_task(self._poll(entry))
+            next_check = self._watch(now)
+            if self._heap:
+                next_check = self._heap[0][0] if next_check is None else min(next_check, self._heap[0][0])
+            timeout = max(next_check - now, 0) if next_check is not None else None
+            self._wakeup.clear()
+            try:
+                async with asyncio.timeout(timeout):
+                    await self._wakeup.wait()
+            except asyncio.TimeoutError:
+                pass
+        self._task = None
+
+    async def _poll(self, entry: _PollEntry) -> None:
+        device_id = entry.device.id
+        task = asyncio.current_task()
+        keep_polling = True
+        failed = False
+        try:
+            async with self._semaphore:
+                entry.running_since = self._loop.time()
+                # The stall timer starts once the poll got its slot
+                self._wakeup.set()
+                keep_polling = await entry.device.poll()
+                entry.last_duration = round(self._loop.time() - entry.running_since, 3)
+                entry.health.completed(self._loop.time())
+        except Exception as ex:  # pylint: disable=W0718
+            failed = True
+            _LOGGER.error("Error while polling device %s : %s", device_id, ex)
+        finally:
+            if self._running.get(device_id) is task:
+                self._running.pop(device_id)
+            else:
+                # Restarted by the watchdog in the meantime
+                task = None
+        if task is None or self._entries.get(device_id) is not entry:
+            return
+        if failed:
+            self._restart(entry, stalled=False)
+        elif keep_polling:
+            self._reschedule(entry)
+        else:
+            _LOGGER.debug("Polling stopped for device %s", device_id)
+            self.remove(device_id)
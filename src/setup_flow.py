@@ -23,9 +23,7 @@ from ucapi import (
 
 import config
 import discover
-from client import PanasonicBlurayDevice
 from config import DeviceInstance
-from const import States
 
 _LOG = logging.getLogger(__name__)
 
@@ -46,6 +44,8 @@ class SetupSteps(IntEnum):
 
 _setup_step = SetupSteps.INIT
 _discovered_devices: list[dict] = []
+# Status of the candidate players that answered the validation, by address
+_validated_players: dict[str, discover.PlayerStatus] = {}
 _cfg_add_device: bool = False
 _reconfigured_device: DeviceInstance | None = None
 _user_input_discovery = RequestUserInput(
@@ -62,9 +62,14 @@ _user_input_discovery = RequestUserInput(
             "field": {
                 "label": {
                     "value": {
-                        "en": "Leave blank to use auto-discovery.",
-                        "de": "Leer lassen, um automatische Erkennung zu verwenden.",
-                        "fr": "Laissez le champ vide pour utiliser la découverte automatique.",
+                        "en": "Leave blank to use auto-discovery, or enter one or more addresses separated by "
+                        "commas, or a network range to scan (e.g. 192.168.1.0/24).",
+                        "de": "Leer lassen, um automatische Erkennung zu verwenden, oder eine oder mehrere durch "
+                        "Kommas getrennte Adressen oder einen zu durchsuchenden Netzwerkbereich eingeben "
+                        "(z.B. 192.168.1.0/24).",
+                        "fr": "Laissez le champ vide pour utiliser la découverte automatique, ou saisissez une ou "
+                        "plusieurs adresses séparées par des virgules, ou une plage réseau à scanner "
+                        "(ex. 192.168.1.0/24).",
                     }
                 }
             },
@@ -348,6 +353,26 @@ async def handle_configuration_mode(
                         },
                         "field": {"checkbox": {"value": _reconfigured_device.always_on}},
                     },
+                    {
+                        "id": "warm_standby",
+                        "label": {
+                            "en": "Warm standby (state shown at once on wake, checks the player every few minutes "
+                            "during standby)",
+                            "fr": "Veille active (état affiché dès le réveil, vérifie le lecteur toutes les quelques "
+                            "minutes pendant la veille)",
+                        },
+                        "field": {"checkbox": {"value": _reconfigured_device.warm_standby}},
+                    },
+                    {
+                        "id": "reset_unsupported_keys",
+                        "label": {
+                            "en": "Forget the keys learned as unsupported by the player "
+                            f"({len(_reconfigured_device.unsupported_keys)})",
+                            "fr": "Oublier les touches détectées comme non supportées par le lecteur "
+                            f"({len(_reconfigured_device.unsupported_keys)})",
+                        },
+                        "field": {"checkbox": {"value": False}},
+                    },
                     {
                         "id": "refresh_interval",
                         "label": {
@@ -378,6 +403,29 @@ async def handle_configuration_mode(
     return _user_input_discovery
 
 
+# Dropdown choice adding all the validated players at once
+ALL_PLAYERS = "*"
+
+
+def _device_name(device: dict) -> str:
+    if device.get("friendlyName"):
+        return f"{device.get('manufacturer')} {device.get('friendlyName')}"
+    return "Panasonic"
+
+
+def _discovered_device_item(device: dict) -> dict:
+    host = device.get("host")
+    status = _validated_players.get(host)
+    if status is None:
+        details = "not answering"
+    else:
+        details = f"{status.variant.name}, {status.state.name.lower()}"
+    return {
+        "id": host,
+        "label": {"en": f"{_device_name(device)} [{host}] ({details})"},
+    }
+
+
 async def _handle_discovery(msg: UserDataResponse) -> RequestUserInput | SetupError:
     """
     Process user data response in a setup process.
@@ -390,37 +438,60 @@ async def _handle_discovery(msg: UserDataResponse) -> RequestUserInput | SetupEr
     """
     global _setup_step
     global _discovered_devices
+    global _validated_players
 
     _discovered_devices = []
-    dropdown_items = []
     _LOG.debug("Handle driver setup with discovery")
 
     address = msg.input_values["address"]
 
-    # pylint: disable = W0718
-    if address:
-        _LOG.debug("Starting manual driver setup for %s", address)
+    if address and "/" in address:
+        _LOG.debug("Starting network scan driver setup for %s", address)
         try:
-            # simple connection check
-            device = PanasonicBlurayDevice(device_config=DeviceInstance(id=address, address=address, name="Panasonic"))
-            await device.update()
-            if device.state == States.UNKNOWN:
-                _LOG.error("Cannot connect to manually entered address %s", address)
-                return SetupError(error_type=IntegrationSetupError.CONNECTION_REFUSED)
-            dropdown_items.append({"id": address, "label": {"en": f"Panasonic [{address}]"}})
-        except Exception as ex:
-            _LOG.error("Cannot connect to manually entered address %s: %s", address, ex)
-            return SetupError(error_type=IntegrationSetupError.CONNECTION_REFUSED)
+            devices = await discover.async_scan_panasonic_devices(address)
+        except ValueError as ex:
+            _LOG.error("Invalid network range %s: %s", address, ex)
+            return SetupError(error_type=IntegrationSetupError.OTHER)
+    elif address:
+        _LOG.debug("Starting manual driver setup for %s", address)
+        devices = [{"host": host.strip()} for host in address.split(",") if host.strip()]
     else:
         _LOG.debug("Starting auto-discovery driver setup")
         devices = await discover.async_identify_panasonic_devices()
-        _discovered_devices = devices
+        if not devices:
+            _LOG.debug("No device found with SSDP, scanning the local network")
+            try:
+                devices = await discover.async_scan_panasonic_devices()
+            except (OSError, ValueError) as ex:
+                _LOG.warning("Cannot scan the local network: %s", ex)
+
+    # All the candidates are checked at once
+    # pylint: disable = W0718
+    try:
+        _validated_players = await discover.async_validate_players([device["host"] for device in devices])
+    except Exception as ex:
+        _LOG.error("Cannot validate the players: %s", ex)
+        return SetupError(error_type=IntegrationSetupError.CONNECTION_REFUSED)
+    if address and "/" not in address:
+        # Manually entered addresses must answer, discovered players are listed anyway
         for device in devices:
-            avr_data = {
-                "id": device.get("host"),
-                "label": {"en": f"{device.get('manufacturer')} {device.get('friendlyName')} [{device.get('host')}]"},
+            if device["host"] not in _validated_players:
+                _LOG.error("Cannot connect to manually entered address %s", device["host"])
+        devices = [device for device in devices if device["host"] in _validated_players]
+        if not devices:
+            return SetupError(error_type=IntegrationSetupError.CONNECTION_REFUSED)
+    _discovered_devices = devices
+    dropdown_items = [_discovered_device_item(device) for device in devices]
+    if len(_validated_players) > 1:
+        dropdown_items.append(
+            {
+                "id": ALL_PLAYERS,
+                "label": {
+                    "en": f"All the answering players ({len(_validated_players)})",
+                    "fr": f"Tous les lecteurs qui répondent ({len(_validated_players)})",
+                },
             }
-            dropdown_items.append(avr_data)
+        )
 
     if not dropdown_items:
         _LOG.warning("No Panasonic device found")
@@ -454,6 +525,16 @@ async def _handle_discovery(msg: UserDataResponse) -> RequestUserInput | SetupEr
                 },
                 "field": {"checkbox": {"value": False}},
             },
+            {
+                "id": "warm_standby",
+                "label": {
+                    "en": "Warm standby (state shown at once on wake, checks the player every few minutes during "
+                    "standby)",
+                    "fr": "Veille active (état affiché dès le réveil, vérifie le lecteur toutes les quelques minutes "
+                    "pendant la veille)",
+                },
+                "field": {"checkbox": {"value": False}},
+            },
             {
                 "id": "refresh_interval",
                 "label": {
@@ -483,60 +564,49 @@ async def handle_device_choice(msg: UserDataResponse) -> SetupComplete | SetupEr
     :param msg: response data from the requested user data
     :return: the setup action on how to continue: SetupComplete if a valid AVR device was chosen.
     """
-    # pylint: disable = W0718
-    host = msg.input_values["choice"]
+    choice = msg.input_values["choice"]
     always_on = msg.input_values.get("always_on") == "true"
+    warm_standby = msg.input_values.get("warm_standby") == "true"
     try:
         refresh_interval = int(msg.input_values.get("refresh_interval", 10))
     except ValueError:
         return SetupError(error_type=IntegrationSetupError.OTHER)
-    device_name = "Panasonic"
-    if _discovered_devices:
-        for device in _discovered_devices:
-            if device.get("host") == host:
-                device_name = f"{device.get('manufacturer')} {device.get('friendlyName')}"
+    hosts = list(_validated_players) if choice == ALL_PLAYERS else [choice]
+    devices = {device.get("host"): device for device in _discovered_devices}
 
-    _LOG.debug("Chosen Panasonic: %s %s. Trying to connect and retrieve device information...", device_name, host)
-    try:
-        # simple connection check
-        device = PanasonicBlurayDevice(device_config=DeviceInstance(id=host, address=host, name=device_name))
-        await device.update()
-        if device.state == States.UNKNOWN:
-            _LOG.error("Cannot connect to manually entered address %s", host)
+    # Players validated during the discovery are not checked again
+    missing = [host for host in hosts if host not in _validated_players]
+    if missing:
+        # pylint: disable = W0718
+        try:
+            _validated_players.update(await discover.async_validate_players(missing))
+        except Exception as ex:
+            _LOG.error("Cannot validate the players: %s", ex)
+            return SetupError(error_type=IntegrationSetupError.CONNECTION_REFUSED)
+    for host in hosts:
+        if host not in _validated_players:
+            _LOG.error("Cannot connect to %s", host)
             return SetupError(error_type=IntegrationSetupError.CONNECTION_REFUSED)
-        identifier = host
-    except Exception as ex:
-        _LOG.error("Cannot connect to %s: %s", host, ex)
-        return SetupError(error_type=IntegrationSetupError.CONNECTION_REFUSED)
-
-    assert device
-    assert identifier
-
-    unique_id = identifier
-
-    if unique_id is None:
-        _LOG.error(
-            "Could not get mac address of host %s: required to create a unique device",
-            host,
-        )
-        return SetupError(error_type=IntegrationSetupError.OTHER)
 
-    config.devices.add_or_update(
-        DeviceInstance(
-            id=unique_id,
-            name=device_name,
-            address=host,
-            always_on=always_on,
-            refresh_interval=refresh_interval,
-        )
-    )  # triggers Panasonic BR instance creation
+    for host in hosts:
+        device_name = _device_name(devices.get(host, {}))
+        status = _validated_players[host]
+        _LOG.debug("Chosen Panasonic: %s %s (%s, %s)", device_name, host, status.variant.name, status.state.name)
+        config.devices.add_or_update(
+            DeviceInstance(
+                id=host,
+                name=device_name,
+                address=host,
+                always_on=always_on,
+                refresh_interval=refresh_interval,
+                warm_standby=warm_standby,
+            )
+        )  # triggers Panasonic BR instance creation
     config.devices.store()
 
     # AVR device connection will be triggered with subscribe_entities request
 
-    await asyncio.sleep(1)
-
-    _LOG.info("Setup successfully completed for %s (%s)", identifier, unique_id)
+    _LOG.info("Setup successfully completed for %s", ", ".join(hosts))
     return SetupComplete()
 
 
@@ -589,18 +659,22 @@ async def _handle_device_reconfigure(
 
     address = msg.input_values.get("address", "")
     always_on = msg.input_values.get("always_on") == "true"
+    warm_standby = msg.input_values.get("warm_standby") == "true"
     try:
         refresh_interval = int(msg.input_values.get("refresh_interval", 10))
     except ValueError:
         return SetupError(error_type=IntegrationSetupError.OTHER)
 
     _LOG.debug("User has changed configuration")
+    if msg.input_values.get("reset_unsupported_keys") == "true" or address != _reconfigured_device.address:
+        # Another player may answer on the new address
+        _reconfigured_device.unsupported_keys = []
     _reconfigured_device.address = address
     _reconfigured_device.always_on = always_on
+    _reconfigured_device.warm_standby = warm_standby
     _reconfigured_device.refresh_interval = refresh_interval
 
     config.devices.add_or_update(_reconfigured_device)  # triggers ATV instance update
-    await asyncio.sleep(1)
     _LOG.info("Setup successfully completed for %s", _reconfigured_device.name)
 
     return SetupComplete()
@@ -625,5 +699,4 @@ async def _handle_backup_restore(msg: UserDataResponse) -> SetupComplete | Setup
         return SetupError(error_type=IntegrationSetupError.OTHER)
     _LOG.debug("Configuration imported successfully")
 
-    await asyncio.sleep(1)
     return SetupComplete()
@@ -0,0 +1,485 @@
+"""
+Sharded multi-process polling for large installations.
+
+Devices are distributed over a pool of worker processes, each one running its own event loop, poll scheduler and
+device instances. Workers send compact state deltas back to the main process, where each device is represented by
+a ShardedDevice proxy that forwards commands to the worker owning it.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import asyncio
+import inspect
+import itertools
+import logging
+import multiprocessing
+from enum import IntEnum
+from multiprocessing.connection import Connection
+from typing import Any, Coroutine
+
+import ucapi
+from ucapi.media_player import Attributes
+
+from client import Events, PanasonicBlurayDevice
+from config import DeviceInstance
+from const import MEDIA_PLAYER_STATE_MAPPING, PlayerVariant, States
+from eventbus import EventBus
+from scheduler import PollScheduler
+from snapshot import DeviceSnapshot
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _Message(IntEnum):
+    """IPC message types, messages are tuples starting with the type."""
+
+    ADD = 0  # (ADD, device_config)
+    REMOVE = 1  # (REMOVE, device_id)
+    CALL = 2  # (CALL, seq, device_id, method, args)
+    RESULT = 3  # (RESULT, seq, result, error)
+    STATE = 4  # (STATE, device_id, state, media_position, media_duration, available, variant, stale, reachable)
+    EVENT = 5  # (EVENT, device_id, event)
+
+
+# pylint: disable=R0903
+class _Worker:
+    """Poller running in a worker process."""
+
+    def __init__(self, conn: Connection):
+        self._conn = conn
+        self._devices: dict[str, PanasonicBlurayDevice] = {}
+        self._scheduler: PollScheduler | None = None
+        self._closed: asyncio.Future | None = None
+
+    async def run(self) -> None:
+        """Serve the main process requests until the pipe is closed."""
+        loop = asyncio.get_running_loop()
+        self._scheduler = PollScheduler(loop)
+        self._closed = loop.create_future()
+        loop.add_reader(self._conn.fileno(), self._on_readable)
+        await self._closed
+        loop.remove_reader(self._conn.fileno())
+        await self._scheduler.stop()
+        await asyncio.gather(*(device.close() for device in self._devices.values()), return_exceptions=True)
+
+    def _on_readable(self) -> None:
+        try:
+            while self._conn.poll():
+                self._handle(self._conn.recv())
+        except (EOFError, OSError):
+            # Main process is gone
+            if not self._closed.done():
+                self._closed.set_result(None)
+
+    def _handle(self, message: tuple) -> None:
+        match message[0]:
+            case _Message.ADD:
+                device_config: DeviceInstance = message[1]
+                device = PanasonicBlurayDevice(device_config, poll_scheduler=self._scheduler)
+                device.events.on(Events.UPDATE, lambda device_id, _update: self._send_state(device_id))
+                device.events.on(Events.CONNECTED, lambda device_id: self._send(_Message.EVENT, device_id, "CONNECTED"))
+                device.events.on(
+                    Events.CAPABILITIES_CHANGED,
+                    lambda device_id, keys: self._send(_Message.EVENT, device_id, "CAPABILITIES_CHANGED", keys),
+                )
+                self._devices[device.id] = device
+            case _Message.REMOVE:
+                device = self._devices.pop(message[1], None)
+                if device is not None:
+                    device.events.remove_all_listeners()
+                    asyncio.get_running_loop().create_task(device.close())
+            case _Message.CALL:
+                _, seq, device_id, method, args = message
+                asyncio.get_running_loop().create_task(self._call(seq, device_id, method, args))
+
+    async def _call(self, seq: int, device_id: str, method: str, args: tuple) -> None:
+        device = self._devices.get(device_id)
+        result = error = None
+        try:
+            if device is None:
+                raise KeyError(device_id)
+            result = getattr(device, method)(*args)
+            if inspect.isawaitable(result):
+                result = await result
+        except Exception as ex:  # pylint: disable=W0718
+            error = repr(ex)
+        if device is not None:
+            self._send_state(device_id)
+        self._send(_Message.RESULT, seq, result, error)
+
+    def _send_state(self, device_id: str) -> None:
+        device = self._devices.get(device_id)
+        if device is not None:
+            self._send(
+                _Message.STATE,
+                device_id,
+                int(device.state),
+                device.media_position,
+                device.media_duration,
+                device.available,
+                device.snapshot.variant,
+                device.stale,
+                device.reachable,
+            )
+
+    def _send(self, *message) -> None:
+        try:
+            self._conn.send(message)
+        except (OSError, ValueError) as ex:
+            _LOGGER.error("Cannot send message to the main process: %s", ex)
+
+
+def _worker_main(conn: Connection, inherited: list[Connection], log_level: int, loop_factory: type) -> None:
+    # Close the pipes of the other workers inherited from the main process
+    for other in inherited:
+        other.close()
+    logging.getLogger().setLevel(log_level)
+    # Same event loop implementation as the main process
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        runner.run(_Worker(conn).run())
+
+
+def _forward(method: str, default: Any = None):
+    """
+    Create a proxy method forwarding the call to the worker owning the device.
+
+    :param method: device method name
+    :param default: result returned when the worker cannot be reached
+    """
+
+    async def proxy(self: "ShardedDevice", *args):
+        return await self.call(method, *args, default=default)
+
+    proxy.__name__ = method
+    proxy.__doc__ = f"Run {method} on the device in its worker process."
+    return proxy
+
+
+class ShardedDevice:
+    """Main process proxy of a device polled by a worker process."""
+
+    def __init__(self, pool: "ShardPool", device_config: DeviceInstance, shard: int):
+        """Create the proxy, state is updated from the deltas sent by the worker."""
+        self._pool = pool
+        self._device_config = device_config
+        self._shard = shard
+        self._state = States.UNKNOWN
+        self._media_position = 0
+        self._media_duration = 0
+        self._available = True
+        self._reachable = True
+        self._variant = PlayerVariant.AUTO
+        self._stale = False
+        self._tasks: set[asyncio.Task] = set()
+        self.events: EventBus[Events] = EventBus(pool.loop, device_config.id, coalesce=[Events.UPDATE])
+
+    @property
+    def id(self) -> str:
+        """Device identifier."""
+        return self._device_config.id
+
+    @property
+    def name(self) -> str:
+        """Device name."""
+        return self._device_config.name
+
+    @property
+    def shard(self) -> int:
+        """Index of the worker process owning the device."""
+        return self._shard
+
+    @property
+    def state(self) -> States:
+        """Device state."""
+        return self._state
+
+    @property
+    def media_position(self) -> int:
+        """Media position."""
+        return self._media_position
+
+    @property
+    def media_duration(self) -> int:
+        """Media duration."""
+        return self._media_duration
+
+    @property
+    def stale(self) -> bool:
+        """True if the state is restored from a snapshot and not yet confirmed by the device."""
+        return self._stale
+
+    @property
+    def snapshot(self) -> DeviceSnapshot:
+        """Snapshot of the last known state, to be persisted."""
+        return DeviceSnapshot(self._state.name, self._variant.name, self._media_duration)
+
+    @property
+    def poll_interval(self) -> float:
+        """Polling interval in seconds."""
+        return self._device_config.refresh_interval
+
+    @property
+    def available(self) -> bool:
+        """True if the device is reachable."""
+        return self._available
+
+    @property
+    def reachable(self) -> bool:
+        """True if the last request to the device succeeded."""
+        return self._reachable
+
+    @property
+    def is_on(self) -> bool:
+        """True if device is on."""
+        return self.state in [States.PAUSED, States.STOPPED, States.PLAYING, States.ON]
+
+    def mark_unavailable(self) -> None:
+        """Mark the device unavailable, here and in the worker process."""
+        if self._state != States.UNAVAILABLE:
+            self._state = States.UNAVAILABLE
+            self.events.emit(Events.UPDATE, self.id, {Attributes.STATE: ucapi.media_player.States.UNAVAILABLE})
+        self.create_task(self.call("mark_unavailable"))
+
+    def create_task(self, coro: Coroutine) -> asyncio.Task:
+        """Create a background task owned by the device."""
+        task = self._pool.loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def restore(self, snapshot: DeviceSnapshot) -> None:
+        """Restore the last known state of the device from a snapshot, here and in the worker process."""
+        if self._state != States.UNKNOWN or snapshot.state not in States.__members__:
+            return
+        self._state = States[snapshot.state]
+        self._media_duration = snapshot.media_duration
+        self._stale = True
+        self.create_task(self.call("restore", snapshot))
+
+    async def call(self, method: str, *args, default: Any = None) -> Any:
+        """
+        Run the given device method in the worker process.
+
+        :param method: device method name
+        :param args: method arguments
+        :param default: result returned when the worker cannot be reached
+        """
+        try:
+            return await self._pool.call(self._shard, self.id, method, args)
+        except (ConnectionError, RuntimeError) as ex:
+            _LOGGER.error("Cannot run %s on device %s: %s", method, self.id, ex)
+            return default
+
+    def reconfigure(self, device_config: DeviceInstance, changes: set[str]) -> None:
+        """Apply an updated configuration in the worker process."""
+        self._device_config = device_config
+        self.create_task(self.call("reconfigure", device_config, changes))
+
+    async def close(self) -> None:
+        """Remove the device from its worker and cancel the pending calls."""
+        self._pool.remove_device(self)
+        tasks = [task for task in self._tasks if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # pylint: disable=R0913,R0917
+    def apply_state(
+        self,
+        state: int,
+        media_position: int,
+        media_duration: int,
+        available: bool,
+        variant: str,
+        stale: bool,
+        reachable: bool,
+    ) -> None:
+        """Apply a state delta received from the worker and emit the resulting update."""
+        self._available = available
+        self._reachable = reachable
+        self._variant = PlayerVariant[variant]
+        # First answer of the device after a restored state : confirm all the attributes
+        confirmed = self._stale and not stale
+        self._stale = stale
+        update_data = {}
+        if state != self._state or confirmed:
+            self._state = States(state)
+            update_data[Attributes.STATE] = MEDIA_PLAYER_STATE_MAPPING.get(
+                self._state, ucapi.media_player.States.UNKNOWN
+            )
+        if media_position != self._media_position or confirmed:
+            self._media_position = media_position
+            update_data[Attributes.MEDIA_POSITION] = media_position
+        if media_duration != self._media_duration or confirmed:
+            self._media_duration = media_duration
+            update_data[Attributes.MEDIA_DURATION] = media_duration
+        if update_data:
+            self.events.emit(Events.UPDATE, self.id, update_data)
+
+    connect = _forward("connect")
+    disconnect = _forward("disconnect")
+    update = _forward("update")
+    start_polling = _forward("start_polling")
+    stop_polling = _forward("stop_polling")
+    send_key = _forward("send_key", ucapi.StatusCodes.SERVICE_UNAVAILABLE)
+    toggle = _forward("toggle", ucapi.StatusCodes.SERVICE_UNAVAILABLE)
+    turn_on = _forward("turn_on", ucapi.StatusCodes.SERVICE_UNAVAILABLE)
+    turn_off = _forward("turn_off", ucapi.StatusCodes.SERVICE_UNAVAILABLE)
+    channel_up = _forward("channel_up", ucapi.StatusCodes.SERVICE_UNAVAILABLE)
+    channel_down = _forward("channel_down", ucapi.StatusCodes.SERVICE_UNAVAILABLE)
+    play_pause = _forward("play_pause", ucapi.StatusCodes.SERVICE_UNAVAILABLE)
+    play = _forward("play", ucapi.StatusCodes.SERVICE_UNAVAILABLE)
+    pause = _forward("pause", ucapi.StatusCodes.SERVICE_UNAVAILABLE)
+    stop = _forward("stop", ucapi.StatusCodes.SERVICE_UNAVAILABLE)
+    eject = _forward("eject", ucapi.StatusCodes.SERVICE_UNAVAILABLE)
+    fast_forward = _forward("fast_forward", ucapi.StatusCodes.SERVICE_UNAVAILABLE)
+    rewind = _forward("rewind", ucapi.StatusCodes.SERVICE_UNAVAILABLE)
+    enter_standby = _forward("enter_standby")
+    exit_standby = _forward("exit_standby", False)
+    hold_key = _forward("hold_key", ucapi.StatusCodes.SERVICE_UNAVAILABLE)
+    repeat_key = _forward("repeat_key", ucapi.StatusCodes.SERVICE_UNAVAILABLE)
+    wait_for_state = _forward("wait_for_state", False)
+
+
+class ShardPool:
+    """Pool of worker processes polling the devices."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, workers: int):
+        """Create a pool of the given number of workers, started with start()."""
+        self.loop = loop
+        self._workers = workers
+        self._processes: list[multiprocessing.Process] = []
+        self._connections: list[Connection] = []
+        self._devices: list[dict[str, ShardedDevice]] = []
+        self._pending: dict[int, tuple[int, asyncio.Future]] = {}
+        self._counter = itertools.count()
+
+    def start(self) -> bool:
+        """
+        Start the worker processes.
+
+        :return: False if multiple processes are not supported on this platform
+        """
+        try:
+            # Fork keeps the loaded modules and works in frozen builds, spawn would re-run the driver entry point
+            context = multiprocessing.get_context("fork")
+        except ValueError:
+            _LOGGER.warning("Sharded polling is not supported on this platform, using a single process")
+            return False
+        for shard in range(self._workers):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_worker_main,
+                args=(
+                    child_conn,
+                    list(self._connections),
+                    logging.getLogger().getEffectiveLevel(),
+                    type(self.loop),
+                ),
+                name=f"poller-{shard}",
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            self._processes.append(process)
+            self._connections.append(parent_conn)
+            self._devices.append({})
+            self.loop.add_reader(parent_conn.fileno(), self._on_readable, shard)
+        _LOGGER.info("Started %s polling worker processes", self._workers)
+        return True
+
+    async def stop(self) -> None:
+        """Stop the worker processes."""
+        for shard, conn in enumerate(self._connections):
+            self.loop.remove_reader(conn.fileno())
+            conn.close()
+            self._fail_shard(shard)
+        for process in self._processes:
+            await self.loop.run_in_executor(None, process.join, 5)
+        self._processes.clear()
+        self._connections.clear()
+
+    def add_device(self, device_config: DeviceInstance) -> ShardedDevice:
+        """Assign the device to the least loaded worker and return its proxy."""
+        shard = min(range(len(self._devices)), key=lambda index: len(self._devices[index]))
+        device = ShardedDevice(self, device_config, shard)
+        self._devices[shard][device.id] = device
+        self._send(shard, _Message.ADD, device_config)
+        return device
+
+    def remove_device(self, device: ShardedDevice) -> None:
+        """Remove the device from its worker."""
+        if self._devices[device.shard].pop(device.id, None) is not None:
+            self._send(device.shard, _Message.REMOVE, device.id)
+
+    def distribution(self) -> list[list[str]]:
+        """Return the device identifiers owned by each worker, for inspection."""
+        return [list(devices) for devices in self._devices]
+
+    async def call(self, shard: int, device_id: str, method: str, args: tuple) -> Any:
+        """
+        Run a device method in the worker owning the device and return its result.
+
+        :raises ConnectionError: if the worker process is gone
+        :raises RuntimeError: if the method raised an exception in the worker
+        """
+        seq = next(self._counter)
+        future = self.loop.create_future()
+        self._pending[seq] = (shard, future)
+        try:
+            self._send(shard, _Message.CALL, seq, device_id, method, args)
+            return await future
+        finally:
+            self._pending.pop(seq, None)
+
+    def _send(self, shard: int, *message) -> None:
+        try:
+            self._connections[shard].send(message)
+        except (OSError, ValueError) as ex:
+            raise ConnectionError(f"Polling worker {shard} is gone") from ex
+
+    def _on_readable(self, shard: int) -> None:
+        conn = self._connections[shard]
+        try:
+            while conn.poll():
+                self._handle(shard, conn.recv())
+        except (EOFError, OSError):
+            _LOGGER.error("Polling worker %s exited", shard)
+            self.loop.remove_reader(conn.fileno())
+            self._fail_shard(shard)
+
+    def _handle(self, shard: int, message: tuple) -> None:
+        match message[0]:
+            case _Message.STATE:
+                device = self._devices[shard].get(message[1])
+                if device is not None:
+                    device.apply_state(*message[2:])
+            case _Message.EVENT:
+                device = self._devices[shard].get(message[1])
+                if device is not None:
+                    device.events.emit(message[2], device.id, *message[3:])
+            case _Message.RESULT:
+                _, seq, result, error = message
+                _, future = self._pending.get(seq, (shard, None))
+                if future is None or future.done():
+                    return
+                if error is not None:
+                    future.set_exception(RuntimeError(error))
+                else:
+                    future.set_result(result)
+
+    def _fail_shard(self, shard: int) -> None:
+        for owner, future in self._pending.values():
+            if owner == shard and not future.done():
+                future.set_exception(ConnectionError(f"Polling worker {shard} is gone"))
+        for device in self._devices[shard].values():
+            device.apply_state(
+                States.UNAVAILABLE,
+                device.media_position,
+                device.media_duration,
+                False,
+                device.snapshot.variant,
+                device.stale,
+                False,
+            )
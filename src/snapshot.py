@@ -0,0 +1,140 @@
+"""
+Persisted last known state of the devices.
+
+A small snapshot of each device is saved in the configuration directory, so that the entities can be given a
+plausible state as soon as the driver starts, before the players answer their first poll.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+
+_LOG = logging.getLogger(__name__)
+
+_SNAPSHOT_FILENAME = "state.json"
+
+# Delay to group the state changes of the devices in a single write (seconds)
+SAVE_DELAY = 5.0
+
+
+@dataclass(frozen=True)
+class DeviceSnapshot:
+    """Last known state of a device."""
+
+    state: str
+    variant: str
+    media_duration: int
+    timestamp: float = dataclasses.field(default_factory=time.time)
+
+
+class SnapshotStore:
+    """Snapshots of all the devices, written to the configuration directory with a debounce delay."""
+
+    def __init__(self, data_path: str, loop: asyncio.AbstractEventLoop, delay: float = SAVE_DELAY):
+        """
+        Create the store and load the saved snapshots.
+
+        :param data_path: configuration path of the snapshot file
+        :param loop: event loop running the delayed writes
+        :param delay: delay to group the changes in a single write
+        """
+        self._file_path = os.path.join(data_path, _SNAPSHOT_FILENAME)
+        self._loop = loop
+        self._delay = delay
+        self._snapshots: dict[str, DeviceSnapshot] = {}
+        self._save_handle: asyncio.TimerHandle | None = None
+        self.load()
+
+    def get(self, device_id: str) -> DeviceSnapshot | None:
+        """Get the snapshot of the given device."""
+        return self._snapshots.get(device_id)
+
+    def update(self, device_id: str, snapshot: DeviceSnapshot) -> None:
+        """Update the snapshot of the device, it is written after the debounce delay if its state changed."""
+        previous = self._snapshots.get(device_id)
+        self._snapshots[device_id] = snapshot
+        if previous is None or dataclasses.replace(previous, timestamp=snapshot.timestamp) != snapshot:
+            self._schedule_save()
+
+    def remove(self, device_id: str) -> None:
+        """Remove the snapshot of the given device."""
+        if self._snapshots.pop(device_id, None) is not None:
+            self._schedule_save()
+
+    def clear(self) -> None:
+        """Remove all the snapshots and the snapshot file."""
+        self._snapshots.clear()
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        if os.path.exists(self._file_path):
+            os.remove(self._file_path)
+
+    def flush(self) -> bool:
+        """
+        Write the snapshot file now if a save is pending, e.g. before the driver stops.
+
+        :return: True if there was no pending save or the snapshots could be saved.
+        """
+        if self._save_handle is None:
+            return True
+        return self.store()
+
+    def _schedule_save(self) -> None:
+        if self._save_handle is None:
+            self._save_handle = self._loop.call_later(self._delay, self.store)
+
+    def store(self) -> bool:
+        """
+        Write the snapshot file now.
+
+        :return: True if the snapshots could be saved.
+        """
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        data = {device_id: dataclasses.asdict(snapshot) for device_id, snapshot in self._snapshots.items()}
+        temp_path = self._file_path + ".tmp"
+        try:
+            # Replace the file at once, a partially written file would lose all the snapshots
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, self._file_path)
+            return True
+        except OSError as ex:
+            _LOG.error("Cannot write the state snapshot file : %s", ex)
+        return False
+
+    def load(self) -> bool:
+        """
+        Load the snapshot file.
+
+        :return: True if the snapshots could be loaded.
+        """
+        try:
+            with open(self._file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for device_id, item in data.items():
+                try:
+                    self._snapshots[device_id] = DeviceSnapshot(**item)
+                except TypeError as ex:
+                    _LOG.warning("Invalid state snapshot of %s will be ignored: %s", device_id, ex)
+            return True
+        except FileNotFoundError:
+            _LOG.debug("No state snapshot file")
+        except OSError as ex:
+            _LOG.error("Cannot open the state snapshot file : %s", ex)
+        except (ValueError, AttributeError):
+            _LOG.error("Empty or invalid state snapshot file")
+        return False
+
+
+# pylint: disable=C0103
+snapshots: SnapshotStore | None = None
@@ -0,0 +1,176 @@
+"""
+Lightweight command latency tracing.
+
+A trace starts in the entity command handler and gets a correlation id which follows the command through the
+device command, the HTTP requests and the resulting state update, including the tasks spawned along the way
+(context variables are copied to new tasks). Spans are written as JSON lines or as a Chrome trace file
+(chrome://tracing, https://ui.perfetto.dev).
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import itertools
+import json
+import logging
+import random
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from enum import StrEnum
+from typing import Any, TextIO
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TraceFormat(StrEnum):
+    """Trace file formats."""
+
+    JSONL = "jsonl"
+    CHROME = "chrome"
+
+
+def _json_default(o: Any) -> Any:
+    if isinstance(o, bytes):
+        return o.decode(errors="replace")
+    return str(o)
+
+
+_current_trace: ContextVar[str | None] = ContextVar("trace_id", default=None)
+_NULL_SPAN = nullcontext()
+
+
+class _Span:
+    """Span of the current trace, written to the trace file when it ends."""
+
+    __slots__ = ("_tracer", "_trace_id", "_name", "_attributes", "_start", "_token", "_root")
+
+    def __init__(self, owner: "Tracer", trace_id: str, name: str, attributes: dict[str, Any], root: bool):
+        self._tracer = owner
+        self._trace_id = trace_id
+        self._name = name
+        self._attributes = attributes
+        self._root = root
+        self._start = 0.0
+        self._token = None
+
+    def __enter__(self) -> "_Span":
+        if self._root:
+            self._token = _current_trace.set(self._trace_id)
+        self._start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        end = time.time()
+        if exc_type is not None:
+            self._attributes["error"] = exc_type.__name__
+        if self._token is not None:
+            _current_trace.reset(self._token)
+        self._tracer.write(self._trace_id, self._name, self._start, end, self._attributes)
+
+    async def __aenter__(self) -> "_Span":
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        self.__exit__(exc_type, exc_value, traceback)
+
+
+class Tracer:
+    """Trace writer, disabled until configured with a file."""
+
+    def __init__(self):
+        """Create a disabled tracer."""
+        self._file: TextIO | None = None
+        self._format = TraceFormat.JSONL
+        self._sample_rate = 0.0
+        self._counter = itertools.count(1)
+
+    @property
+    def enabled(self) -> bool:
+        """True if traces are recorded."""
+        return self._file is not None and self._sample_rate > 0
+
+    def configure(self, path: str | None, trace_format: str = TraceFormat.JSONL, sample_rate: float = 1.0) -> None:
+        """
+        Enable tracing to the given file, or disable it if no path is given.
+
+        :param path: trace file path
+        :param trace_format: jsonl or chrome
+        :param sample_rate: fraction of the commands to trace, between 0 and 1
+        """
+        self.close()
+        if not path:
+            return
+        self._format = TraceFormat(trace_format)
+        self._sample_rate = max(0.0, min(sample_rate, 1.0))
+        try:
+            # pylint: disable=R1732
+            self._file = open(path, "a", encoding="utf-8", buffering=1)
+        except OSError as ex:
+            _LOGGER.error("Cannot open trace file %s : %s", path, ex)
+            return
+        if self._format == TraceFormat.CHROME and self._file.tell() == 0:
+            # The closing bracket is optional in the Chrome trace format, which allows to stream events
+            self._file.write("[\n")
+        _LOGGER.info("Tracing %d%% of the commands to %s (%s)", self._sample_rate * 100, path, self._format)
+
+    def close(self) -> None:
+        """Close the trace file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def start_trace(self, name: str, **attributes):
+        """Start a new trace if sampled, to be used as a context manager around the command handler."""
+        if self._file is None or random.random() >= self._sample_rate:
+            return _NULL_SPAN
+        trace_id = f"{next(self._counter):x}-{random.getrandbits(32):08x}"
+        return _Span(self, trace_id, name, attributes, root=True)
+
+    def span(self, name: str, **attributes):
+        """Record a span of the current trace, if any."""
+        trace_id = _current_trace.get()
+        if trace_id is None or self._file is None:
+            return _NULL_SPAN
+        return _Span(self, trace_id, name, attributes, root=False)
+
+    def write(self, trace_id: str, name: str, start: float, end: float, attributes: dict[str, Any]) -> None:
+        """Write a finished span to the trace file."""
+        if self._file is None:
+            return
+        try:
+            if self._format == TraceFormat.CHROME:
+                # One row per trace in the viewer, numbered by the trace sequence number
+                tid = int(trace_id.split("-", 1)[0], 16)
+                event = {
+                    "name": name,
+                    "cat": "command",
+                    "ph": "X",
+                    "ts": int(start * 1e6),
+                    "dur": int((end - start) * 1e6),
+                    "pid": 1,
+                    "tid": tid,
+                    "args": {"trace_id": trace_id, **attributes},
+                }
+                self._file.write(json.dumps(event, default=_json_default) + ",\n")
+            else:
+                record = {
+                    "trace_id": trace_id,
+                    "span": name,
+                    "start": round(start, 6),
+                    "duration_ms": round((end - start) * 1000, 3),
+                    **attributes,
+                }
+                self._file.write(json.dumps(record, default=_json_default) + "\n")
+        except OSError as ex:
+            _LOGGER.error("Cannot write trace, tracing disabled : %s", ex)
+            self.close()
+
+
+def current_trace_id() -> str | None:
+    """Return the correlation id of the current trace, if any."""
+    return _current_trace.get()
+
+
+# pylint: disable=C0103
+tracer = Tracer()
@@ -0,0 +1,86 @@
+"""
+Circuit breaker state transitions.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+from breaker import BreakerState, CircuitBreaker
+
+
+def _open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("player", failure_threshold=3, probe_interval=5.0, max_probe_interval=20.0)
+    for _ in range(3):
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_the_failure_threshold():
+    """The circuit opens on the failure reaching the threshold, and only reports it once."""
+    breaker = CircuitBreaker("player", failure_threshold=3)
+
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.is_closed
+    assert breaker.record_failure()
+    assert breaker.state == BreakerState.OPEN
+    assert not breaker.record_failure()
+
+
+def test_success_resets_the_failure_count():
+    """Failures must be consecutive to open the circuit."""
+    breaker = CircuitBreaker("player", failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+
+    assert not breaker.record_success()
+    assert breaker.failures == 0
+    breaker.record_failure()
+    assert breaker.is_closed
+
+
+def test_failed_probes_back_off_up_to_the_maximum():
+    """A failed probe opens the circuit again with a doubled probe delay, bounded by the maximum."""
+    breaker = _open_breaker()
+    delays = []
+    for _ in range(4):
+        breaker.half_open()
+        assert breaker.state == BreakerState.HALF_OPEN
+        breaker.record_failure()
+        assert breaker.state == BreakerState.OPEN
+        delays.append(breaker.probe_delay)
+
+    assert delays == [10.0, 20.0, 20.0, 20.0]
+
+
+def test_successful_probe_closes_the_circuit():
+    """A successful probe closes the circuit and restores the initial probe delay."""
+    breaker = _open_breaker()
+    breaker.half_open()
+    breaker.record_failure()
+    breaker.half_open()
+
+    assert breaker.record_success()
+    assert breaker.is_closed
+    assert breaker.probe_delay == 5.0
+    assert breaker.open_duration == 0
+
+
+def test_half_open_only_applies_to_an_open_circuit():
+    """A closed circuit is not moved to half-open."""
+    breaker = CircuitBreaker("player")
+    breaker.half_open()
+
+    assert breaker.is_closed
+
+
+def test_reset_closes_the_circuit():
+    """Reset forgets the failures and the probe backoff."""
+    breaker = _open_breaker()
+    breaker.half_open()
+    breaker.record_failure()
+    breaker.reset()
+
+    assert breaker.is_closed
+    assert breaker.failures == 0
+    assert breaker.probe_delay == 5.0
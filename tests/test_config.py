@@ -0,0 +1,39 @@
+"""
+Device configuration changes.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import dataclasses
+
+from config import DeviceInstance, config_changes
+
+DEVICE = DeviceInstance(id="player", name="Player", address="192.168.1.10")
+
+
+def test_no_changes():
+    """Identical configurations have no changes."""
+    assert not config_changes(DEVICE, dataclasses.replace(DEVICE))
+
+
+def test_changed_fields():
+    """The names of the changed fields are returned."""
+    new = dataclasses.replace(DEVICE, address="192.168.1.11", refresh_interval=30, unsupported_keys=["PIPMENU"])
+
+    assert config_changes(DEVICE, new) == {"address", "refresh_interval", "unsupported_keys"}
+
+
+def test_missing_fields_take_their_default():
+    """Fields missing from an older configuration file compare equal to their default."""
+    old = DeviceInstance(
+        id="player",
+        name="Player",
+        address="192.168.1.10",
+        always_on=None,
+        refresh_interval=None,
+        warm_standby=None,
+        unsupported_keys=None,
+    )
+
+    assert not config_changes(old, DEVICE)
@@ -0,0 +1,109 @@
+"""
+Event delivery and coalescing of the device event bus.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import asyncio
+import contextvars
+
+from eventbus import EventBus
+
+UPDATE = "update"
+CONNECTED = "connected"
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def test_pending_updates_are_merged():
+    """Consecutive updates of the same device waiting for delivery are merged into one."""
+
+    async def scenario() -> tuple[list[tuple], dict]:
+        bus: EventBus[str] = EventBus(asyncio.get_running_loop(), "player", coalesce=[UPDATE])
+        received: list[tuple] = []
+        bus.on(UPDATE, lambda *args: received.append(args))
+        changes = {"state": "ON"}
+        bus.emit(UPDATE, "player", changes)
+        bus.emit(UPDATE, "player", {"position": 10})
+        bus.emit(UPDATE, "player", {"position": 11})
+        changes["state"] = "OFF"
+        await asyncio.sleep(0.01)
+        return received, bus.diagnostics()
+
+    received, diagnostics = asyncio.run(scenario())
+
+    assert received == [("player", {"state": "ON", "position": 11})]
+    assert diagnostics["emitted"] == 3
+    assert diagnostics["coalesced"] == 2
+    assert diagnostics["delivered"] == 1
+
+
+def test_events_are_delivered_in_order():
+    """Other events are not merged and keep the emission order, an update is not merged across them."""
+
+    async def scenario() -> list[tuple]:
+        bus: EventBus[str] = EventBus(asyncio.get_running_loop(), "player", coalesce=[UPDATE])
+        received: list[tuple] = []
+        bus.on(UPDATE, lambda *args: received.append((UPDATE, *args)))
+        bus.on(CONNECTED, lambda *args: received.append((CONNECTED, *args)))
+        bus.emit(UPDATE, "player", {"state": "ON"})
+        bus.emit(CONNECTED, "player")
+        bus.emit(CONNECTED, "player")
+        bus.emit(UPDATE, "player", {"state": "OFF"})
+        await asyncio.sleep(0.01)
+        return received
+
+    assert asyncio.run(scenario()) == [
+        (UPDATE, "player", {"state": "ON"}),
+        (CONNECTED, "player"),
+        (CONNECTED, "player"),
+        (UPDATE, "player", {"state": "OFF"}),
+    ]
+
+
+def test_handler_errors_do_not_stop_the_delivery():
+    """A failing handler is logged and the other handlers and events are still delivered."""
+
+    async def scenario() -> tuple[list[str], dict]:
+        bus: EventBus[str] = EventBus(asyncio.get_running_loop(), "player")
+        received: list[str] = []
+
+        def failing(_device_id: str) -> None:
+            raise ValueError("failing handler")
+
+        async def handler(device_id: str) -> None:
+            received.append(device_id)
+
+        bus.on(CONNECTED, failing)
+        bus.on(CONNECTED, handler)
+        bus.emit(CONNECTED, "first")
+        bus.emit(CONNECTED, "second")
+        await asyncio.sleep(0.01)
+        return received, bus.diagnostics()
+
+    received, diagnostics = asyncio.run(scenario())
+
+    assert received == ["first", "second"]
+    assert diagnostics["errors"] == 2
+
+
+def test_handlers_see_the_context_of_the_emitter():
+    """Each event is delivered with the context variables of its emitter."""
+
+    async def scenario() -> list[str | None]:
+        bus: EventBus[str] = EventBus(asyncio.get_running_loop(), "player")
+        received: list[str | None] = []
+        bus.on(CONNECTED, lambda _device_id: received.append(request_id.get()))
+
+        async def emit(value: str | None) -> None:
+            request_id.set(value)
+            bus.emit(CONNECTED, "player")
+
+        await emit("first")
+        await asyncio.create_task(emit("second"))
+        await asyncio.create_task(emit(None))
+        await asyncio.sleep(0.01)
+        return received
+
+    assert asyncio.run(scenario()) == ["first", "second", None]
@@ -0,0 +1,37 @@
+"""
+Parsing of the command sequence steps.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import pytest
+
+from macro import WAIT_TIMEOUT, MacroStep, parse_step
+
+
+def test_command_step():
+    """A step which is not a wait is a command."""
+    assert parse_step("PLAYBACK") == MacroStep("PLAYBACK")
+
+
+@pytest.mark.parametrize(
+    "step, expected",
+    [
+        ("WAIT:ON", MacroStep(None, "ON", WAIT_TIMEOUT)),
+        ("wait:playing", MacroStep(None, "PLAYING", WAIT_TIMEOUT)),
+        ("WAIT: stopped :5", MacroStep(None, "STOPPED", 5.0)),
+        ("WAIT:OFF:2.5", MacroStep(None, "OFF", 2.5)),
+        ("WAIT:PAUSED:", MacroStep(None, "PAUSED", WAIT_TIMEOUT)),
+    ],
+)
+def test_wait_step(step, expected):
+    """Wait steps are case insensitive, with an optional timeout in seconds."""
+    assert parse_step(step) == expected
+
+
+@pytest.mark.parametrize("step", ["WAIT:", "WAIT:STANDBY", "WAIT:ON:soon"])
+def test_invalid_wait_step(step):
+    """Invalid wait steps are rejected."""
+    with pytest.raises(ValueError):
+        parse_step(step)
@@ -0,0 +1,72 @@
+"""
+Remote entity commands sent to an emulated player.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import asyncio
+
+from aiohttp import web
+from ucapi.remote import Commands
+
+import config
+from client import KEY_REPEAT_INTERVAL, PanasonicBlurayDevice
+from remote import PanasonicRemote
+
+# Tolerated scheduling jitter between two key presses, in seconds
+JITTER = 0.15
+
+
+async def _key_times(params: dict[str, str]) -> list[float]:
+    """Send a remote command to an emulated player, return the times the keys were received."""
+    loop = asyncio.get_running_loop()
+    times: list[float] = []
+
+    async def player(request: web.Request) -> web.Response:
+        body = await request.read()
+        if body.startswith(b"cCMD_RC_"):
+            times.append(loop.time())
+            return web.Response(body=b'00, "", 1\r\n\r\n')
+        if body.startswith(b"cCMD_PST"):
+            return web.Response(body=b'00, "", 1\r\n0,0,0,00000000\r\n')
+        return web.Response(body=b'00, "", 1\r\n2,0,0,0,0,1,8,2,0,00000000\r\n')
+
+    app = web.Application()
+    app.router.add_post("/WAN/dvdr/dvdr_ctrl.cgi", player)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    device_config = config.DeviceInstance(
+        id="player", name="Player", address=f"127.0.0.1:{runner.addresses[0][1]}", refresh_interval=60
+    )
+    device = PanasonicBlurayDevice(device_config, refresh_frequency=60)
+    try:
+        await device.connect()
+        entity = PanasonicRemote(device_config, device)
+        await entity.command(Commands.SEND_CMD, params, websocket=None)
+    finally:
+        await device.close()
+        await runner.cleanup()
+    return times
+
+
+def _intervals(times: list[float]) -> list[float]:
+    return [after - before for before, after in zip(times, times[1:])]
+
+
+def test_repeat_keeps_the_configured_delay():
+    """Repeated commands are spaced by the delay parameter."""
+    times = asyncio.run(_key_times({"command": "UP", "repeat": "3", "delay": "1"}))
+
+    assert len(times) == 3
+    assert all(1 <= interval < 1 + JITTER for interval in _intervals(times))
+
+
+def test_repeat_without_delay_is_sent_like_a_held_key():
+    """Repeated commands without delay are sent at the key repeat interval."""
+    times = asyncio.run(_key_times({"command": "UP", "repeat": "3"}))
+
+    assert len(times) == 3
+    assert all(KEY_REPEAT_INTERVAL <= interval < KEY_REPEAT_INTERVAL + JITTER for interval in _intervals(times))
@@ -0,0 +1,46 @@
+"""
+Retry policies of the player requests.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import asyncio
+import errno
+from unittest import mock
+
+import aiohttp
+
+from retry import IDEMPOTENT_KEY_POLICY, KEY_POLICY, STATUS_POLICY, key_policy
+
+CONNECT_ERROR = aiohttp.ClientConnectorError(mock.Mock(), OSError(errno.ECONNREFUSED, "Connection refused"))
+BROKEN_PIPE = aiohttp.ClientOSError(errno.EPIPE, "Broken pipe")
+READ_TIMEOUT = aiohttp.ServerTimeoutError("Timeout on reading data from socket")
+
+
+def test_keys_are_only_retried_when_not_sent():
+    """A key press is retried only if it did not reach the player."""
+    assert KEY_POLICY.should_retry(CONNECT_ERROR, 0)
+    assert KEY_POLICY.should_retry(BROKEN_PIPE, 0)
+    assert not KEY_POLICY.should_retry(READ_TIMEOUT, 0)
+    assert not KEY_POLICY.should_retry(CONNECT_ERROR, KEY_POLICY.retries)
+
+
+def test_idempotent_requests_are_retried_on_any_client_error():
+    """Status queries and idempotent keys are retried after a timeout, up to their number of retries."""
+    for policy in (STATUS_POLICY, IDEMPOTENT_KEY_POLICY):
+        assert policy.should_retry(READ_TIMEOUT, 0)
+        assert not policy.should_retry(READ_TIMEOUT, policy.retries)
+        assert not policy.should_retry(asyncio.CancelledError(), 0)
+
+
+def test_retry_delay_backs_off_up_to_the_maximum():
+    """The retry delay doubles after each attempt."""
+    assert [STATUS_POLICY.delay(attempt) for attempt in range(6)] == [0.1, 0.2, 0.4, 0.8, 1.0, 1.0]
+
+
+def test_key_policy():
+    """Only the keys with the same outcome when pressed twice get the idempotent policy."""
+    assert key_policy("POWERON") is IDEMPOTENT_KEY_POLICY
+    assert key_policy("POWER") is KEY_POLICY
+    assert key_policy("UP") is KEY_POLICY
@@ -0,0 +1,68 @@
+"""
+Round-trip time estimation and the derived timeouts.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import pytest
+
+from rtt import CONNECT_TIMEOUT_RATIO, MAX_BACKOFF, RttEstimator
+
+
+def test_initial_timeout_before_the_first_sample():
+    """The initial timeout is used until a request succeeds."""
+    estimator = RttEstimator("player", 3.0)
+
+    assert estimator.srtt is None
+    assert estimator.read_timeout == 3.0
+    assert estimator.connect_timeout == 3.0 * CONNECT_TIMEOUT_RATIO
+
+
+def test_timeout_follows_the_samples():
+    """The timeout is the smoothed round-trip time plus four deviations."""
+    estimator = RttEstimator("player", 3.0, min_timeout=0.0)
+    estimator.record(0.2)
+
+    assert estimator.srtt == 0.2
+    assert estimator.rttvar == 0.1
+    assert estimator.read_timeout == pytest.approx(0.6)
+    for _ in range(100):
+        estimator.record(0.2)
+    assert estimator.srtt == pytest.approx(0.2)
+    assert estimator.read_timeout == pytest.approx(0.2, abs=0.01)
+
+
+def test_timeouts_stay_within_the_bounds():
+    """The derived timeouts are bounded whatever the samples."""
+    estimator = RttEstimator("player", 3.0, min_timeout=0.5, max_timeout=10.0)
+    for _ in range(20):
+        estimator.record(0.001)
+
+    assert estimator.read_timeout == 0.5
+    assert estimator.connect_timeout == 0.5
+    estimator.record(60.0)
+    assert estimator.read_timeout == 10.0
+
+
+def test_timeouts_back_off_until_the_next_success():
+    """Each timeout doubles the timeout up to the maximum backoff, a success restores it."""
+    estimator = RttEstimator("player", 0.5, min_timeout=0.5, max_timeout=100.0)
+    for _ in range(10):
+        estimator.record_timeout()
+
+    assert estimator.read_timeout == 0.5 * MAX_BACKOFF
+    assert estimator.diagnostics()["timeouts"] == 10
+    estimator.record(0.5)
+    assert estimator.read_timeout < 0.5 * MAX_BACKOFF
+
+
+def test_reset_forgets_the_estimates():
+    """After a reset the initial timeout applies again."""
+    estimator = RttEstimator("player", 3.0)
+    estimator.record(0.1)
+    estimator.record_timeout()
+    estimator.reset()
+
+    assert estimator.srtt is None
+    assert estimator.read_timeout == 3.0
@@ -0,0 +1,107 @@
+"""
+Request scheduling between user commands and background polls.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import asyncio
+
+import pytest
+
+from scheduler import (
+    MIN_STALL_TIME,
+    STALL_INTERVALS,
+    PollCancelled,
+    RequestPriority,
+    RequestScheduler,
+    stall_time,
+)
+
+
+async def _request(scheduler: RequestScheduler, priority: RequestPriority, name: str, served: list[str]) -> None:
+    async with scheduler.request(priority):
+        served.append(name)
+        await asyncio.sleep(0)
+
+
+def test_commands_are_served_before_polls():
+    """Waiting commands go before the polls, in arrival order within a priority."""
+
+    async def scenario() -> tuple[list[str], RequestScheduler]:
+        scheduler = RequestScheduler("player")
+        served: list[str] = []
+        async with scheduler.request(RequestPriority.POLL):
+            tasks = [
+                asyncio.create_task(_request(scheduler, RequestPriority.POLL, "poll", served)),
+                asyncio.create_task(_request(scheduler, RequestPriority.COMMAND, "command1", served)),
+                asyncio.create_task(_request(scheduler, RequestPriority.COMMAND, "command2", served)),
+            ]
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return served, scheduler
+
+    served, scheduler = asyncio.run(scenario())
+
+    assert served == ["command1", "command2"]
+    assert scheduler.cancelled_polls == 1
+    assert scheduler.in_flight == 0
+    assert scheduler.pending == 0
+
+
+def test_pending_polls_are_cancelled_by_a_command():
+    """A poll waiting for a slot raises PollCancelled when a command arrives."""
+
+    async def scenario() -> None:
+        scheduler = RequestScheduler("player")
+        async with scheduler.request(RequestPriority.COMMAND):
+            poll = asyncio.create_task(_request(scheduler, RequestPriority.POLL, "poll", []))
+            await asyncio.sleep(0)
+            assert scheduler.pending == 1
+            command = asyncio.create_task(_request(scheduler, RequestPriority.COMMAND, "command", []))
+            await asyncio.sleep(0)
+        await command
+        with pytest.raises(PollCancelled):
+            await poll
+
+    asyncio.run(scenario())
+
+
+def test_polls_wait_for_each_other():
+    """Polls are not cancelled by other polls and are served in turn."""
+
+    async def scenario() -> list[str]:
+        scheduler = RequestScheduler("player")
+        served: list[str] = []
+        await asyncio.gather(*(_request(scheduler, RequestPriority.POLL, f"poll{i}", served) for i in range(3)))
+        return served
+
+    assert asyncio.run(scenario()) == ["poll0", "poll1", "poll2"]
+
+
+def test_cancelled_waiter_releases_its_place():
+    """A waiting request cancelled by its caller leaves the queue and the slot is handed to the next one."""
+
+    async def scenario() -> tuple[list[str], RequestScheduler]:
+        scheduler = RequestScheduler("player")
+        served: list[str] = []
+        async with scheduler.request(RequestPriority.COMMAND):
+            first = asyncio.create_task(_request(scheduler, RequestPriority.COMMAND, "first", served))
+            second = asyncio.create_task(_request(scheduler, RequestPriority.COMMAND, "second", served))
+            await asyncio.sleep(0)
+            first.cancel()
+            await asyncio.sleep(0)
+        await second
+        return served, scheduler
+
+    served, scheduler = asyncio.run(scenario())
+
+    assert served == ["second"]
+    assert scheduler.in_flight == 0
+    assert scheduler.pending == 0
+
+
+def test_stall_time():
+    """A poll is stalled after several intervals, with a minimum running time."""
+    assert stall_time(1) == MIN_STALL_TIME
+    assert stall_time(60) == STALL_INTERVALS * 60
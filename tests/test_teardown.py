@@ -0,0 +1,108 @@
+"""
+Leak check of the device teardown.
+
+Devices are repeatedly added, connected, reconfigured, sent commands and removed through the driver handlers against
+an emulated player : the number of asyncio tasks and open file descriptors must stay flat, and removed devices must be
+garbage collected.
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import asyncio
+import dataclasses
+import gc
+import os
+import weakref
+
+import pytest
+from aiohttp import web
+
+import config
+import driver
+import snapshot
+
+CYCLES = 20
+# Tolerated growth of the open file descriptors, e.g. lazily opened resources of the libraries
+FD_SLACK = 2
+SETTLE_TIMEOUT = 5.0
+
+
+async def _player(request: web.Request) -> web.Response:
+    """Emulated player : a stopped BD player accepting all the keys."""
+    body = await request.read()
+    if body.startswith(b"cCMD_PST"):
+        return web.Response(body=b'00, "", 1\r\n0,0,0,00000000\r\n')
+    if body.startswith(b"cCMD_GET_STATUS"):
+        return web.Response(body=b'00, "", 1\r\n2,0,0,0,0,1,8,2,0,00000000\r\n')
+    return web.Response(body=b'00, "", 1\r\n\r\n')
+
+
+def _open_fds() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+async def _settle() -> int:
+    """Wait for the background tasks to end, return the number of remaining tasks."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SETTLE_TIMEOUT
+    count = len(asyncio.all_tasks())
+    while loop.time() < deadline:
+        await asyncio.sleep(0.1)
+        previous, count = count, len(asyncio.all_tasks())
+        if count == previous:
+            break
+    return count
+
+
+async def _cycle(address: str, devices: list[weakref.ref]) -> None:
+    device_id = f"player{len(devices)}"
+    device_config = config.DeviceInstance(id=device_id, name="Player", address=address, refresh_interval=5)
+    config.devices.add_or_update(device_config)
+    device = driver._configured_devices[device_id]  # pylint: disable=W0212
+    devices.append(weakref.ref(device))
+    await driver._connect_devices()  # pylint: disable=W0212
+    config.devices.add_or_update(dataclasses.replace(device_config, refresh_interval=6, always_on=True))
+    await device.play()
+    await device.send_key("UP")
+    config.devices.remove(device_id)
+    del device
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="open file descriptors are counted from /proc")
+def test_add_update_remove_cycles_do_not_leak(tmp_path, monkeypatch):
+    """Repeated add/update/remove cycles keep the task and file descriptor counts flat."""
+    loop = driver._LOOP  # pylint: disable=W0212
+    monkeypatch.setattr(
+        config,
+        "devices",
+        config.Devices(str(tmp_path), driver.on_device_added, driver.on_device_removed, driver.on_device_updated),
+    )
+    monkeypatch.setattr(snapshot, "snapshots", snapshot.SnapshotStore(str(tmp_path), loop))
+    devices: list[weakref.ref] = []
+
+    async def scenario() -> tuple[int, int, int, int]:
+        app = web.Application()
+        app.router.add_post("/WAN/dvdr/dvdr_ctrl.cgi", _player)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        address = f"127.0.0.1:{runner.addresses[0][1]}"
+        try:
+            # Warm-up cycle : libraries open their resources on first use
+            await _cycle(address, devices)
+            tasks, fds = await _settle(), _open_fds()
+            for _ in range(CYCLES):
+                await _cycle(address, devices)
+            return tasks, fds, await _settle(), _open_fds()
+        finally:
+            await runner.cleanup()
+
+    tasks_before, fds_before, tasks_after, fds_after = loop.run_until_complete(scenario())
+
+    assert tasks_after <= tasks_before
+    assert fds_after <= fds_before + FD_SLACK
+    gc.collect()
+    assert not driver._configured_devices  # pylint: disable=W0212
+    assert [ref for ref in devices if ref() is not None] == []
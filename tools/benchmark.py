@@ -0,0 +1,404 @@
+"""
+Benchmark suite of the integration.
+
+Runs the player client against an emulated Panasonic player served from a separate process, so that the measures
+only reflect the client side, and prints the results as JSON.
+
+Usage:
+    python tools/benchmark.py --devices 20 --duration 10 --loop asyncio uvloop
+    python tools/benchmark.py --replay traffic.jsonl.gz --speed 10
+    python tools/benchmark.py --scenario memory --devices 500
+
+:copyright: (c) 2026 by Albaintor inc
+:license: Mozilla Public License Version 2.0, see LICENSE for more details.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from multiprocessing.connection import Connection
+from typing import Any, Awaitable, Callable
+
+import ucapi
+from aiohttp import web
+from pyee.asyncio import AsyncIOEventEmitter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# pylint: disable=C0413
+from client import Events, PanasonicBlurayDevice  # noqa: E402
+from config import DeviceInstance  # noqa: E402
+from const import remote_buttons_mapping, remote_ui_pages, simple_commands  # noqa: E402
+from descriptors import MEDIA_PLAYER_FEATURES, REMOTE_FEATURES  # noqa: E402
+from eventbus import EventBus  # noqa: E402
+from media_player import PanasonicMediaPlayer  # noqa: E402
+from recording import ReplaySession, load_trace  # noqa: E402
+from remote import PanasonicRemote  # noqa: E402
+
+_LOG = logging.getLogger("benchmark")
+
+LOOPS = ["asyncio", "uvloop"]
+
+
+class _EmulatedPlayer:  # pylint: disable=R0903
+    """Minimal emulation of the dvdr_ctrl.cgi API of a BD player."""
+
+    def __init__(self, latency: float):
+        self._latency = latency
+        self._power = True
+        self._play = 1
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """Answer a command."""
+        body = await request.read()
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        cmd = body.split(b".x=", 1)[0]
+        if cmd == b"cCMD_PST":
+            return web.Response(body=f'00, "", 1\r\n{self._play},120,0,00000000\r\n'.encode())
+        if cmd == b"cCMD_GET_STATUS":
+            power = 2 if self._power else 0
+            return web.Response(body=f'00, "", 1\r\n{power},0,0,120,3600,1,8,2,0,00000000\r\n'.encode())
+        return web.Response(body=b'00, "", 1\r\n\r\n')
+
+
+def _serve(conn: Connection, latency: float) -> None:
+    async def serve():
+        app = web.Application()
+        app.router.add_post("/WAN/dvdr/dvdr_ctrl.cgi", _EmulatedPlayer(latency).handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        conn.send(site._server.sockets[0].getsockname()[1])  # pylint: disable=W0212
+        await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+        await runner.cleanup()
+
+    asyncio.run(serve())
+
+
+def loop_factory(name: str) -> Callable[[], asyncio.AbstractEventLoop] | None:
+    """Return the event loop factory of the given implementation, None if not available."""
+    if name == "uvloop":
+        try:
+            # pylint: disable=C0415
+            import uvloop
+
+            return uvloop.new_event_loop
+        except ImportError:
+            return None
+    return asyncio.new_event_loop
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    if not samples:
+        return {}
+    samples = sorted(samples)
+    quantiles = statistics.quantiles(samples, n=100, method="inclusive") if len(samples) > 1 else samples * 99
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "p50_ms": round(quantiles[49] * 1000, 3),
+        "p95_ms": round(quantiles[94] * 1000, 3),
+        "p99_ms": round(quantiles[98] * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3),
+    }
+
+
+def _devices(args: argparse.Namespace) -> list[PanasonicBlurayDevice]:
+    return [
+        PanasonicBlurayDevice(DeviceInstance(id=f"bench{i}", name=f"Bench {i}", address=f"127.0.0.1:{args.port}"))
+        for i in range(args.devices)
+    ]
+
+
+async def _close(devices: list[PanasonicBlurayDevice]) -> None:
+    await asyncio.gather(*(device.disconnect() for device in devices))
+
+
+async def _poll_until(
+    device: PanasonicBlurayDevice, deadline: float, counter: list[int], latencies: list[float] | None = None
+) -> None:
+    while time.monotonic() < deadline:
+        start = time.monotonic()
+        await device.update()
+        counter[0] += 1
+        if latencies is not None:
+            latencies.append(time.monotonic() - start)
+
+
+async def bench_poll(args: argparse.Namespace) -> dict[str, Any]:
+    """Poll throughput : every device polls back to back for the given duration."""
+    devices = _devices(args)
+    await asyncio.gather(*(device.connect() for device in devices))
+    await asyncio.gather(*(device.stop_polling() for device in devices))
+    counter = [0]
+    start = time.monotonic()
+    await asyncio.gather(*(_poll_until(device, start + args.duration, counter) for device in devices))
+    elapsed = time.monotonic() - start
+    await _close(devices)
+    return {"polls": counter[0], "polls_per_second": round(counter[0] / elapsed, 1)}
+
+
+async def bench_command(args: argparse.Namespace) -> dict[str, Any]:
+    """Command latency : one device receives commands while all the devices keep polling."""
+    devices = _devices(args)
+    await asyncio.gather(*(device.connect() for device in devices))
+    await asyncio.gather(*(device.stop_polling() for device in devices))
+    counter = [0]
+    deadline = time.monotonic() + args.duration
+    pollers = [asyncio.create_task(_poll_until(device, deadline, counter)) for device in devices]
+    latencies = []
+    while time.monotonic() < deadline:
+        start = time.monotonic()
+        await devices[0].send_key("UP")
+        latencies.append(time.monotonic() - start)
+        await asyncio.sleep(args.command_interval)
+    await asyncio.gather(*pollers)
+    await _close(devices)
+    return _percentiles(latencies)
+
+
+async def _wake(device: PanasonicBlurayDevice, start: float) -> float:
+    # As the driver : states of warm devices are served at once, the others are connected and refreshed
+    if not await device.exit_standby():
+        await device.connect()
+        await device.update()
+    return time.monotonic() - start
+
+
+async def bench_standby(args: argparse.Namespace) -> dict[str, Any]:
+    """Standby : requests sent during a standby of the given duration and delay until the states are known on wake."""
+    results = {}
+    for warm in (False, True):
+        devices = [
+            PanasonicBlurayDevice(
+                DeviceInstance(
+                    id=f"bench{i}",
+                    name=f"Bench {i}",
+                    address=f"127.0.0.1:{args.port}",
+                    refresh_interval=5,
+                    warm_standby=warm,
+                )
+            )
+            for i in range(args.devices)
+        ]
+        await asyncio.gather(*(device.connect() for device in devices))
+        await asyncio.gather(*(device.update() for device in devices))
+        await asyncio.gather(*(device.enter_standby() for device in devices))
+        requests = sum(device.diagnostics["requests"] for device in devices)
+        await asyncio.sleep(args.duration)
+        requests = sum(device.diagnostics["requests"] for device in devices) - requests
+        start = time.monotonic()
+        delays = await asyncio.gather(*(_wake(device, start) for device in devices))
+        await asyncio.gather(*(device.close() for device in devices))
+        results["warm" if warm else "cold"] = {"standby_requests": requests, "wake": _percentiles(delays)}
+    return results
+
+
+async def _emit_updates(emitter: AsyncIOEventEmitter | EventBus, count: int, batch: int) -> dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    calls = [0]
+
+    async def on_update(_device_id: str, update: dict[str, Any]) -> None:
+        calls[0] += 1
+        await asyncio.sleep(0)
+        if update["seq"] == count - 1 and not done.done():
+            done.set_result(None)
+
+    emitter.on(Events.UPDATE, on_update)
+    start = time.monotonic()
+    for seq in range(count):
+        emitter.emit(Events.UPDATE, "bench", {"seq": seq})
+        if seq % batch == batch - 1:
+            # Let the loop run between the bursts, as between two polls
+            await asyncio.sleep(0)
+    await done
+    elapsed = time.monotonic() - start
+    return {"events_per_second": round(count / elapsed), "handler_calls": calls[0]}
+
+
+async def bench_events(args: argparse.Namespace) -> dict[str, Any]:
+    """Event delivery : state updates emitted in bursts to an async handler, pyee emitter against the event bus."""
+    loop = asyncio.get_running_loop()
+    results = {"pyee": await _emit_updates(AsyncIOEventEmitter(loop), args.events, args.devices)}
+    bus: EventBus[Events] = EventBus(loop, "bench", coalesce=[Events.UPDATE])
+    results["eventbus"] = await _emit_updates(bus, args.events, args.devices)
+    results["eventbus"]["queue"] = bus.diagnostics()
+    return results
+
+
+def _rss() -> int | None:
+    """Resident set size of the process in bytes, None if not available."""
+    try:
+        with open("/proc/self/statm", encoding="utf-8") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _unshared_entities(config: DeviceInstance) -> list[ucapi.Entity]:
+    """Entities building their own features and options lists, as before the shared descriptors, for comparison."""
+    return [
+        ucapi.MediaPlayer(
+            f"media_player.{config.id}",
+            config.name,
+            list(MEDIA_PLAYER_FEATURES),
+            {},
+            options={ucapi.media_player.Options.SIMPLE_COMMANDS: simple_commands(config.unsupported_keys)},
+        ),
+        ucapi.Remote(
+            f"remote.{config.id}",
+            config.name,
+            list(REMOTE_FEATURES),
+            {},
+            simple_commands=simple_commands(config.unsupported_keys),
+            button_mapping=remote_buttons_mapping(config.unsupported_keys),
+            ui_pages=remote_ui_pages(config.unsupported_keys),
+        ),
+    ]
+
+
+def _measure(build: Callable[[], Any]) -> tuple[Any, int, int | None]:
+    """Build the objects, returning them with the traced allocations and the resident size increase in bytes."""
+    gc.collect()
+    rss = _rss()
+    traced = tracemalloc.get_traced_memory()[0]
+    objects = build()
+    gc.collect()
+    rss_after = _rss()
+    return objects, tracemalloc.get_traced_memory()[0] - traced, rss_after - rss if rss is not None else None
+
+
+async def bench_memory(args: argparse.Namespace) -> dict[str, Any]:
+    """Memory : allocations and resident size per configured player, for the device and its entities."""
+    configs = [DeviceInstance(id=f"bench{i}", name=f"Bench {i}", address="127.0.0.1") for i in range(args.devices)]
+    tracemalloc.start()
+    try:
+        devices, device_bytes, device_rss = _measure(lambda: [PanasonicBlurayDevice(config) for config in configs])
+        _, shared_bytes, shared_rss = _measure(
+            lambda: [
+                (PanasonicMediaPlayer(config, device), PanasonicRemote(config, device))
+                for config, device in zip(configs, devices)
+            ]
+        )
+        _, unshared_bytes, unshared_rss = _measure(lambda: [_unshared_entities(config) for config in configs])
+    finally:
+        tracemalloc.stop()
+
+    def per_player(value: int | None) -> int | None:
+        return round(value / len(configs)) if value is not None else None
+
+    return {
+        "players": len(configs),
+        "device_bytes_per_player": per_player(device_bytes),
+        "device_rss_per_player": per_player(device_rss),
+        "entities_bytes_per_player": per_player(shared_bytes),
+        "entities_rss_per_player": per_player(shared_rss),
+        "unshared_entities_bytes_per_player": per_player(unshared_bytes),
+        "unshared_entities_rss_per_player": per_player(unshared_rss),
+    }
+
+
+async def bench_replay(args: argparse.Namespace) -> dict[str, Any]:
+    """Replay : every recorded device polls back to back, served with its recorded replies."""
+    devices = []
+    for device_id, replies in load_trace(args.replay).items():
+        session = ReplaySession(replies, args.speed)
+        devices.append(
+            PanasonicBlurayDevice(
+                DeviceInstance(id=device_id, name=device_id, address="replay"),
+                session_factory=lambda session=session: session,
+            )
+        )
+    updates = [0]
+    for device in devices:
+        device.events.on(Events.UPDATE, lambda *_: updates.__setitem__(0, updates[0] + 1))
+    await asyncio.gather(*(device.connect() for device in devices))
+    await asyncio.gather(*(device.stop_polling() for device in devices))
+    counter = [0]
+    latencies: list[float] = []
+    start = time.monotonic()
+    await asyncio.gather(*(_poll_until(device, start + args.duration, counter, latencies) for device in devices))
+    elapsed = time.monotonic() - start
+    await asyncio.gather(*(device.close() for device in devices))
+    return {
+        "devices": len(devices),
+        "polls": counter[0],
+        "polls_per_second": round(counter[0] / elapsed, 1),
+        "updates": updates[0],
+        "poll_latency": _percentiles(latencies),
+    }
+
+
+SCENARIOS: dict[str, Callable[[argparse.Namespace], Awaitable[dict[str, Any]]]] = {
+    "poll": bench_poll,
+    "command": bench_command,
+    "standby": bench_standby,
+    "events": bench_events,
+    "memory": bench_memory,
+    "replay": bench_replay,
+}
+
+
+def main() -> None:
+    """Run the benchmarks and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0].strip())
+    parser.add_argument("--scenario", nargs="+", choices=list(SCENARIOS), help="scenarios to run")
+    parser.add_argument("--loop", nargs="+", choices=LOOPS, default=["asyncio"], help="event loops to compare")
+    parser.add_argument("--devices", type=int, default=10, help="number of emulated players")
+    parser.add_argument("--duration", type=float, default=5, help="duration of each scenario in seconds")
+    parser.add_argument("--latency", type=float, default=0.005, help="response time of the emulated player")
+    parser.add_argument("--command-interval", type=float, default=0.05, help="delay between commands in seconds")
+    parser.add_argument("--events", type=int, default=100000, help="number of updates of the events scenario")
+    parser.add_argument("--replay", help="trace file recorded with UC_RECORD_FILE, for the replay scenario")
+    parser.add_argument("--speed", type=float, default=1, help="replay speed factor, 0 to replay without delays")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    if not args.scenario:
+        args.scenario = ["replay"] if args.replay else ["poll", "command"]
+    if "replay" in args.scenario and not args.replay:
+        parser.error("the replay scenario requires --replay")
+
+    player = None
+    if set(args.scenario) - {"replay", "events", "memory"}:
+        server, conn = multiprocessing.Pipe()
+        player = multiprocessing.Process(target=_serve, args=(conn, args.latency), daemon=True)
+        player.start()
+        args.port = server.recv()
+
+    results: dict[str, Any] = {
+        "python": sys.version.split()[0],
+        "devices": args.devices,
+        "duration": args.duration,
+        "latency": args.latency,
+        "results": {},
+    }
+    try:
+        for loop_name in args.loop:
+            factory = loop_factory(loop_name)
+            if factory is None:
+                _LOG.warning("Event loop %s is not available, skipped", loop_name)
+                continue
+            loop_results = results["results"].setdefault(loop_name, {})
+            for scenario in args.scenario:
+                with asyncio.Runner(loop_factory=factory) as runner:
+                    loop_results[scenario] = runner.run(SCENARIOS[scenario](args))
+    finally:
+        if player is not None:
+            server.send(None)
+            player.join(5)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()